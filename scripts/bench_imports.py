@@ -0,0 +1,104 @@
+"""
+Import-time benchmark for the CLI and API entry points.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters and
+reports the median cumulative import time plus the heaviest imports, so
+startup regressions (e.g. a heavy dependency imported at module load) show up.
+
+Usage:
+    python scripts/bench_imports.py
+    python scripts/bench_imports.py --runs 7 --max-ms src.main=150 src.api=900
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+ENTRY_POINTS = ["src.main", "src.api"]
+
+
+def _import_times(module: str) -> List[Tuple[str, int]]:
+    """
+    Return (module, cumulative microseconds) for every import triggered by
+    `import <module>` in one run. Interpreter startup imports (site, etc.) are
+    excluded.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+    group: List[Tuple[str, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _, rest = line.partition(":")
+        _, cumulative, raw_name = rest.split("|")
+        name = raw_name.strip()
+        group.append((name, int(cumulative)))
+        # A top-level (unindented) entry closes the tree of imports it caused
+        if raw_name[1:2] != " ":
+            if name == module:
+                return group
+            group = []
+    return group
+
+
+def bench(module: str, runs: int, top: int) -> float:
+    totals: List[float] = []
+    heaviest: Dict[str, List[int]] = {}
+    for _ in range(runs):
+        rows = _import_times(module)
+        totals.append(dict(rows).get(module, 0) / 1000)
+        for name, us in rows:
+            heaviest.setdefault(name, []).append(us)
+    median_ms = statistics.median(totals)
+    print(f"{module}: median {median_ms:.1f} ms over {runs} runs (min {min(totals):.1f}, max {max(totals):.1f})")
+    ranked = sorted(
+        ((name, statistics.median(us) / 1000) for name, us in heaviest.items() if name != module),
+        key=lambda x: x[1],
+        reverse=True,
+    )
+    for name, ms in ranked[:top]:
+        print(f"    {ms:8.1f} ms  {name}")
+    return median_ms
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreter runs per entry point")
+    parser.add_argument("--top", type=int, default=8, help="Number of heaviest imports to list")
+    parser.add_argument(
+        "--max-ms",
+        nargs="*",
+        default=[],
+        metavar="MODULE=MS",
+        help="Fail (exit 1) if a module's median import time exceeds the budget",
+    )
+    args = parser.parse_args(argv)
+
+    budgets = {}
+    for item in args.max_ms:
+        name, _, ms = item.partition("=")
+        budgets[name] = float(ms)
+
+    failed = False
+    for module in ENTRY_POINTS:
+        median_ms = bench(module, args.runs, args.top)
+        budget = budgets.get(module)
+        if budget is not None and median_ms > budget:
+            print(f"  FAIL: {module} took {median_ms:.1f} ms, budget {budget:.1f} ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""
+Load test for the FastAPI server against fake Drive and Gemini backends.
+
+Each scenario (serving mode x simulated clients x per-request file
+concurrency) runs in a fresh interpreter. That interpreter starts the app
+in-process on uvicorn, with a fake Drive (tests.fakes.FakeDrive) serving
+Docs, Slides, PDFs and .pptx files, and a local fake Gemini HTTP server, both
+with configurable latency. PDFs of at least 8 MiB take the parallel ranged
+download path, and .pptx files are parsed in the CPU process pool. N client threads
+then behave like the extension: they call /summarize-folder and wait
+(mode "sync"), or POST /jobs and poll GET /jobs/{id} (mode "jobs").
+
+Reported per scenario: requests/s, latency p50/p95/p99/max, event-loop lag
+(max, p99, and total time the loop was blocked for more than 10 ms), and
+peak RSS.
+
+Usage:
+    python scripts/load_test.py
+    python scripts/load_test.py --mode sync jobs --clients 10 50 --concurrency 4 8
+    python scripts/load_test.py --gemini-latency 2 --gemini-jitter 0.5 --hedge --json results.json
+    python scripts/load_test.py --pdf-mib 1 --clients 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MODES = ["sync", "jobs"]
+LAG_INTERVAL_S = 0.01
+# Event-loop lag above this counts as blocked time
+BLOCKED_LAG_S = 0.01
+JOB_POLL_S = 0.1
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[idx]
+
+
+def _peak_rss_mib() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class _LagMonitor:
+    """Measures how late the server's event loop wakes up from short sleeps."""
+
+    def __init__(self) -> None:
+        self.lags: List[float] = []
+        self.stopped = False
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self.stopped:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL_S)
+            self.lags.append(max(0.0, loop.time() - start - LAG_INTERVAL_S))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "loop_lag_max_ms": round(max(self.lags, default=0.0) * 1000, 1),
+            "loop_lag_p99_ms": round(_percentile(self.lags, 99) * 1000, 1),
+            "loop_blocked_s": round(sum(lag for lag in self.lags if lag > BLOCKED_LAG_S), 2),
+        }
+
+
+def _client(
+    base_url: str, mode: str, client_id: int, requests_per_client: int, start: threading.Barrier, out: List[Dict]
+) -> None:
+    import requests
+
+    session = requests.Session()
+    start.wait()
+    for n in range(requests_per_client):
+        body = {"folderId": "root", "subjectName": f"Load {client_id}"}
+        began = time.perf_counter()
+        ok = False
+        error = None
+        try:
+            if mode == "sync":
+                resp = session.post(f"{base_url}/summarize-folder", json=body, timeout=600)
+                ok = resp.status_code == 200 and resp.json().get("status") == "ok"
+                if not ok:
+                    error = f"HTTP {resp.status_code}: {resp.text[:200]}"
+            else:
+                resp = session.post(f"{base_url}/jobs", json=body, timeout=60)
+                resp.raise_for_status()
+                job_url = f"{base_url}{resp.json()['status_url']}"
+                while True:
+                    time.sleep(JOB_POLL_S)
+                    job = session.get(job_url, timeout=60).json()
+                    if job["status"] in ("done", "failed"):
+                        ok = job["status"] == "done"
+                        error = job.get("error")
+                        break
+        except Exception as e:
+            error = str(e)
+        out.append({"latency": time.perf_counter() - began, "ok": ok, "error": error})
+
+
+def run_scenario(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one scenario in this process and return its metrics."""
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from tests.fakes import FakeDrive, FakeGeminiServer, Latency
+
+    gemini = FakeGeminiServer(
+        Latency(cfg["gemini_latency"], cfg["gemini_jitter"], cfg["gemini_tail_rate"], cfg["gemini_tail_s"]),
+        error_rate=cfg["gemini_error_rate"],
+    ).start()
+    drive = FakeDrive(
+        files_per_folder=cfg["files"],
+        subfolders=cfg["subfolders"],
+        latency=Latency(cfg["drive_latency"]),
+        fresh_revisions=not cfg["cached"],
+        pdf_bytes=int(cfg["pdf_mib"] * 1024 * 1024),
+    ).start()
+    workdir = Path(tempfile.mkdtemp(prefix="study-agent-load-"))
+    # Configure the app before it is imported (it reads settings at import time)
+    os.environ.update({
+        "GEMINI_API_KEY": "load-test",
+        "GEMINI_API_ROOTS": gemini.url,
+        "GEMINI_HEDGE": "1" if cfg["hedge"] else "",
+        "STUDY_AGENT_CONCURRENCY": str(cfg["concurrency"]),
+        "STUDY_AGENT_CACHE_DIR": str(workdir / "cache"),
+        "STUDY_AGENT_OUTPUT_DIR": str(workdir / "output"),
+    })
+
+    import uvicorn
+
+    from src import api
+    from src.auth import set_drive_service_factory
+
+    set_drive_service_factory(drive.service)
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    base_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    server = uvicorn.Server(uvicorn.Config(api.app, log_level="warning", lifespan="off"))
+    loop = asyncio.new_event_loop()
+    server_thread = threading.Thread(
+        target=loop.run_until_complete, args=(server.serve(sockets=[sock]),), name="uvicorn", daemon=True
+    )
+    server_thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    async def _configure() -> None:
+        import anyio.to_thread
+
+        anyio.to_thread.current_default_thread_limiter().total_tokens = cfg["threadpool"]
+
+    asyncio.run_coroutine_threadsafe(_configure(), loop).result()
+    monitor = _LagMonitor()
+    lag_future = asyncio.run_coroutine_threadsafe(monitor.run(), loop)
+
+    results: List[Dict] = []
+    barrier = threading.Barrier(cfg["clients"] + 1)
+    clients = [
+        threading.Thread(
+            target=_client,
+            args=(base_url, cfg["mode"], i, cfg["requests_per_client"], barrier, results),
+            name=f"client-{i}",
+        )
+        for i in range(cfg["clients"])
+    ]
+    for t in clients:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in clients:
+        t.join()
+    wall = time.perf_counter() - started
+
+    monitor.stopped = True
+    lag_future.result()
+    server.should_exit = True
+    server_thread.join(timeout=10)
+    gemini.stop()
+    drive.stop()
+
+    latencies = [r["latency"] for r in results if r["ok"]]
+    errors = [r["error"] for r in results if not r["ok"]]
+    return {
+        "mode": cfg["mode"],
+        "clients": cfg["clients"],
+        "concurrency": cfg["concurrency"],
+        "threadpool": cfg["threadpool"],
+        "requests": len(results),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_s": round(wall, 2),
+        "req_per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_s": round(_percentile(latencies, 50), 3),
+        "p95_s": round(_percentile(latencies, 95), 3),
+        "p99_s": round(_percentile(latencies, 99), 3),
+        "max_s": round(max(latencies, default=0.0), 3),
+        "mean_s": round(statistics.mean(latencies), 3) if latencies else 0.0,
+        "gemini_calls": gemini.calls,
+        **monitor.stats(),
+        "peak_rss_mib": _peak_rss_mib(),
+    }
+
+
+def _format_table(rows: List[Dict[str, Any]]) -> str:
+    columns = [
+        ("mode", "mode"), ("clients", "clients"), ("concurrency", "conc"), ("requests", "reqs"),
+        ("errors", "errs"), ("req_per_s", "req/s"), ("p50_s", "p50 s"), ("p95_s", "p95 s"),
+        ("p99_s", "p99 s"), ("loop_lag_max_ms", "lag max ms"), ("loop_blocked_s", "blocked s"),
+        ("peak_rss_mib", "peak RSS MiB"),
+    ]
+    table = [[title for _, title in columns]]
+    for row in rows:
+        table.append([
+            f"{row[key]:.1f}" if key == "peak_rss_mib" and row[key] is not None else str(row[key])
+            for key, _ in columns
+        ])
+    widths = [max(len(r[i]) for r in table) for i in range(len(columns))]
+    lines = ["  ".join(cell.rjust(w) for cell, w in zip(r, widths)) for r in table]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", nargs="+", choices=MODES, default=["sync"], help="Serving modes to compare")
+    parser.add_argument("--clients", nargs="+", type=int, default=[10], help="Concurrent simulated clients")
+    parser.add_argument(
+        "--concurrency", nargs="+", type=int, default=[4], help="Files summarized in parallel per request"
+    )
+    parser.add_argument("--threadpool", type=int, default=40, help="Server threadpool size (anyio tokens)")
+    parser.add_argument("--requests-per-client", type=int, default=3)
+    parser.add_argument("--files", type=int, default=6, help="Files per folder (Doc, PDF, Slides, .pptx in turn)")
+    parser.add_argument("--subfolders", type=int, default=0, help="Subfolders under the fake root")
+    parser.add_argument("--pdf-mib", type=float, default=9.0, help="Size of each fake PDF (ranged from 8 MiB)")
+    parser.add_argument("--drive-latency", type=float, default=0.05, help="Seconds per fake Drive call")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="Median seconds per fake Gemini call")
+    parser.add_argument("--gemini-jitter", type=float, default=0.3, help="Lognormal sigma of Gemini latency")
+    parser.add_argument("--gemini-tail-rate", type=float, default=0.0, help="Share of Gemini calls that are slow")
+    parser.add_argument("--gemini-tail-s", type=float, default=5.0, help="Extra seconds for slow Gemini calls")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0, help="Share of Gemini calls answered 503")
+    parser.add_argument("--hedge", action="store_true", help="Enable hedged Gemini requests")
+    parser.add_argument("--cached", action="store_true", help="Keep file revisions stable so repeats hit the cache")
+    parser.add_argument("--json", type=Path, help="Also write all results to this JSON file")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.scenario:
+        print(json.dumps(run_scenario(json.loads(args.scenario))))
+        return 0
+
+    base = {
+        "threadpool": args.threadpool,
+        "requests_per_client": args.requests_per_client,
+        "files": args.files,
+        "subfolders": args.subfolders,
+        "pdf_mib": args.pdf_mib,
+        "drive_latency": args.drive_latency,
+        "gemini_latency": args.gemini_latency,
+        "gemini_jitter": args.gemini_jitter,
+        "gemini_tail_rate": args.gemini_tail_rate,
+        "gemini_tail_s": args.gemini_tail_s,
+        "gemini_error_rate": args.gemini_error_rate,
+        "hedge": args.hedge,
+        "cached": args.cached,
+    }
+    rows: List[Dict[str, Any]] = []
+    for mode, clients, concurrency in itertools.product(args.mode, args.clients, args.concurrency):
+        cfg = dict(base, mode=mode, clients=clients, concurrency=concurrency)
+        print(f"Running mode={mode} clients={clients} concurrency={concurrency} ...", file=sys.stderr)
+        # Fresh interpreter per scenario: clean caches and a per-scenario peak RSS
+        proc = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--scenario", json.dumps(cfg)],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            return 1
+        row = json.loads(proc.stdout.strip().splitlines()[-1])
+        if row["first_error"]:
+            print(f"  first error: {row['first_error']}", file=sys.stderr)
+        rows.append(row)
+
+    print(_format_table(rows))
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,4 +7,4 @@ if (!(Test-Path -Path ".venv")) {
 
 . ".venv/Scripts/Activate.ps1"
 
-python -m src.server
+python -m src.server @args
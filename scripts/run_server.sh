@@ -9,4 +9,4 @@ fi
 # shellcheck disable=SC1091
 source .venv/bin/activate
 
-python -m src.server
+python -m src.server "$@"
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import socket
+import threading
+from typing import Any, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.poolmanager import PoolManager
+
+
+class RequestAborted(RuntimeError):
+    """Raised when a request is issued on (or interrupted by) an aborted session."""
+
+
+class _TrackingPoolManager(PoolManager):
+    """
+    PoolManager that reports every connection it creates, so the owning session
+    can shut down sockets that are blocked mid-request.
+    """
+
+    def __init__(self, *args: Any, on_connection=None, **kwargs: Any):
+        self._on_connection = on_connection
+        super().__init__(*args, **kwargs)
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context=request_context)
+        new_conn = pool._new_conn
+        on_connection = self._on_connection
+
+        def _tracked_new_conn():
+            conn = new_conn()
+            if on_connection is not None:
+                on_connection(conn)
+            return conn
+
+        pool._new_conn = _tracked_new_conn  # type: ignore[method-assign]
+        return pool
+
+
+class _TrackingAdapter(HTTPAdapter):
+    def __init__(self, on_connection, **kwargs: Any):
+        self._on_connection = on_connection
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = _TrackingPoolManager(
+            num_pools=connections,
+            maxsize=maxsize,
+            block=block,
+            on_connection=self._on_connection,
+            **pool_kwargs,
+        )
+
+
+class AbortableSession(requests.Session):
+    """
+    requests.Session whose in-flight calls can be aborted from another thread.
+    abort() shuts down every socket the session opened, which makes a blocked
+    read fail immediately instead of waiting for the server or the timeout.
+    An aborted session refuses further requests; discard it afterwards.
+    """
+
+    def __init__(self, pool_maxsize: int = 10):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._connections: List[Any] = []
+        self.aborted = False
+        adapter = _TrackingAdapter(self._track, pool_maxsize=pool_maxsize)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def _track(self, conn: Any) -> None:
+        with self._lock:
+            # Drop connections that have since been closed
+            self._connections = [c for c in self._connections if getattr(c, "sock", None) is not None]
+            self._connections.append(conn)
+
+    def request(self, *args: Any, **kwargs: Any):  # type: ignore[override]
+        if self.aborted:
+            raise RequestAborted("Session was aborted")
+        try:
+            return super().request(*args, **kwargs)
+        except requests.RequestException:
+            if self.aborted:
+                raise RequestAborted("Request aborted")
+            raise
+
+    def abort(self) -> None:
+        self.aborted = True
+        with self._lock:
+            conns = list(self._connections)
+        for conn in conns:
+            sock = getattr(conn, "sock", None)
+            if sock is None:
+                continue
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.close()
@@ -1,24 +1,32 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
 from .auth import get_drive_service
-from .config import get_defaults
-from .drive_client import (
-    MIME_GOOGLE_DOC,
-    MIME_PDF,
-    download_pdf,
-    export_google_doc_as_text,
-    list_study_files,
-)
-from .gemini_client import GeminiClient
+from .cache import FileCache
+from .config import get_defaults, get_gemini_config
+from .deadline import CLIENT_DISCONNECTED, Cancelled, Deadline
+from .extractors import Unsupported, list_supported_files
+from .gemini_client import GeminiClient, HedgeState
+from .planner import GeminiTokenCounter, LocalTokenCounter, plan_files
+from .pipeline import summarize_uncached
+from .profiling import RunProfiler
+from .scheduler import run_scheduled
+from .search_index import open_search_index
+from .store import JOB_LEASE_S, Heartbeat, open_store
 from .summarizer import merge_file_summaries
+from .tree_merge import folder_path, merge_tree
 from .utils import ensure_dir, slugify, extract_folder_id
 
 
@@ -26,11 +34,30 @@ class SummarizeFolderRequest(BaseModel):
     folderId: str = Field(..., description="Google Drive folder ID")
     subjectName: str = Field(..., description="Subject name for the merged summary")
     semester: Optional[str] = Field(None, description="Optional semester label")
+    rollup: bool = Field(False, description="Merge folder by folder along the Drive hierarchy (cached)")
+    timeoutSeconds: Optional[float] = Field(
+        None, gt=0, description="Cancel the run after this many seconds (default STUDY_AGENT_REQUEST_TIMEOUT)"
+    )
+
+
+class PlanRequest(BaseModel):
+    folderId: str = Field(..., description="Google Drive folder ID")
+    countTokens: bool = Field(False, description="Count cached text with Gemini countTokens instead of a local estimate")
 
 
 defaults = get_defaults()
 OUTPUT_DIR: Path = defaults["output_dir"]  # type: ignore[assignment]
 ensure_dir(OUTPUT_DIR)
+# Shared SQLite store: job state, per-file cache and locks for all workers
+STORE = open_store(defaults["cache_dir"])  # type: ignore[arg-type]
+FILE_CACHE = FileCache(STORE)
+SEARCH_INDEX = open_search_index(defaults["cache_dir"])  # type: ignore[arg-type]
+_search_synced = False
+# Hedging latencies, budget and executor, shared by all requests in this worker
+_hedging: Optional[HedgeState] = None
+_hedging_lock = threading.Lock()
+# How often a running /summarize-folder request checks whether its client is gone
+DISCONNECT_POLL_S = 0.5
 
 app = FastAPI(title="Study Agent API", version="1.0.0")
 
@@ -52,8 +79,118 @@ async def health():
     return {"status": "ok"}
 
 
-@app.post("/summarize-folder")
-async def summarize_folder(req: SummarizeFolderRequest):
+def _gemini_client() -> GeminiClient:
+    """A Gemini client for one request, sharing this worker's hedging state."""
+    global _hedging
+    with _hedging_lock:
+        if _hedging is None:
+            cfg = get_gemini_config()
+            _hedging = HedgeState(cfg["hedge_percentile"], cfg["hedge_max_rate"])
+    return GeminiClient(hedging=_hedging)
+
+
+def _summarize_file(
+    gemini: GeminiClient, cache: FileCache, f: Dict, deadline: Deadline
+) -> Tuple[Optional[Tuple[str, str]], Optional[str], int]:
+    """
+    Summarize one Drive file on a scheduler worker thread.
+    Return ((name, summary) or None, error message or None, tokens saved by preprocessing).
+    """
+    name = f.get("name", f.get("id", "file"))
+    fid = f.get("id")
+    if not fid:
+        return None, f"Missing file ID for {name}", 0
+    with cache.claim_summary(f, gemini.model, deadline=deadline) as cached:
+        if cached is not None:
+            return (name, cached), None, 0
+        return _summarize_uncached(gemini, cache, f, name, deadline)
+
+
+def _summarize_uncached(
+    gemini: GeminiClient, cache: FileCache, f: Dict, name: str, deadline: Deadline
+) -> Tuple[Optional[Tuple[str, str]], Optional[str], int]:
+    try:
+        summary, stats = summarize_uncached(gemini, cache, f, deadline)
+    except Unsupported as e:
+        return None, f"Skipped {name}: {e}", 0
+    except Exception as e:
+        return None, f"{name}: {e}", 0
+    if summary is None:
+        return None, f"Empty export for {name}", 0
+    return (name, summary), None, stats.get("tokens_saved", 0)
+
+
+@app.get("/search")
+def search(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=100)):
+    """
+    Full-text search over generated summaries. Returns ranked sections with
+    snippets and a link to the summary file.
+    """
+    global _search_synced
+    if not _search_synced:
+        # Once per worker: index summaries written before the index existed
+        SEARCH_INDEX.sync(OUTPUT_DIR)
+        _search_synced = True
+    results = SEARCH_INDEX.search(q, limit=limit)
+    for r in results:
+        r["summary_url"] = f"/output/{r['path']}"
+    return {"query": q, "results": results}
+
+
+@app.post("/plan")
+def plan(req: PlanRequest):
+    """
+    Estimate requests, tokens, cache hits and wall time for a folder without
+    calling generateContent. A plain def, so FastAPI runs it in the
+    threadpool: the Drive listing and countTokens calls block.
+    """
+    try:
+        folder_id = extract_folder_id(req.folderId.strip())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid folderId or URL")
+
+    try:
+        service = get_drive_service()
+        files = list_supported_files(service, folder_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Drive error: {e}")
+
+    gemini_cfg = get_gemini_config()
+    counter = GeminiTokenCounter() if req.countTokens else LocalTokenCounter()
+    try:
+        return plan_files(
+            files,
+            FILE_CACHE,
+            model=gemini_cfg["model"],
+            counter=counter,
+            concurrency=defaults["concurrency"],
+            rpm=gemini_cfg["rpm"],
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Planning failed: {e}")
+
+
+def _request_deadline(req: SummarizeFolderRequest) -> Deadline:
+    return Deadline(req.timeoutSeconds or defaults["request_timeout"] or None)
+
+
+def _cancelled_error(deadline: Deadline) -> HTTPException:
+    if deadline.expired:
+        return HTTPException(
+            status_code=504,
+            detail="Deadline exceeded; files finished so far are cached and will be reused on retry",
+        )
+    # 499 Client Closed Request (nginx convention); nobody is left to read it
+    return HTTPException(status_code=499, detail=f"Cancelled: {deadline.reason}")
+
+
+def _run_summarize(req: SummarizeFolderRequest, deadline: Optional[Deadline] = None) -> Dict:
+    """
+    Summarize a folder end to end. Blocking; run it off the event loop.
+    Raises HTTPException for request and Drive errors, and when the deadline
+    is cancelled or expires (per-file summaries already finished stay cached).
+    """
+    deadline = deadline or Deadline()
     subject_name = req.subjectName.strip()
     folder_id_raw = req.folderId.strip()
     semester = (req.semester or "").strip()
@@ -69,42 +206,35 @@ async def summarize_folder(req: SummarizeFolderRequest):
 
     try:
         service = get_drive_service()
-        files = list_study_files(service, folder_id)
+        files = list_supported_files(service, folder_id, deadline=deadline)
+    except Cancelled:
+        raise _cancelled_error(deadline)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Drive error: {e}")
 
     if not files:
         return {"status": "empty", "message": "No supported files in folder", "filesProcessed": 0}
 
-    gemini = GeminiClient()
+    gemini = _gemini_client()
 
+    try:
+        results = run_scheduled(
+            files,
+            lambda _, f: _summarize_file(gemini, FILE_CACHE, f, deadline),
+            max_workers=defaults["concurrency"],
+            deadline=deadline,
+        )
+    except Cancelled:
+        raise _cancelled_error(deadline)
     summaries: List[Tuple[str, str]] = []
     errors: List[str] = []
-
-    for f in files:
-        name = f.get("name", f.get("id", "file"))
-        mime = f.get("mimeType", "")
-        fid = f.get("id")
-        if not fid:
-            errors.append(f"Missing file ID for {name}")
-            continue
-        try:
-            if mime == MIME_PDF:
-                pdf_bytes = download_pdf(service, fid)
-                summary = gemini.summarize_pdf_bytes(pdf_bytes, name)
-            elif mime == MIME_GOOGLE_DOC:
-                text = export_google_doc_as_text(service, fid)
-                if not text.strip():
-                    errors.append(f"Empty export for {name}")
-                    continue
-                summary = gemini.summarize_plain_text(text, name)
-            else:
-                # skip unsupported
-                continue
-            summaries.append((name, summary))
-        except Exception as e:
-            errors.append(f"{name}: {e}")
-            continue
+    tokens_saved = 0
+    for summary, error, saved in results:  # type: ignore[misc]
+        if summary is not None:
+            summaries.append(summary)
+        if error:
+            errors.append(error)
+        tokens_saved += saved
 
     if not summaries:
         return {
@@ -122,15 +252,131 @@ async def summarize_folder(req: SummarizeFolderRequest):
     out_path = OUTPUT_DIR / out_name
 
     try:
-        merged = merge_file_summaries(subject_name, summaries, semester=semester)
+        if req.rollup:
+            items = [
+                (folder_path(f), r[0][0], r[0][1])
+                for f, r in zip(files, results)
+                if r[0] is not None
+            ]
+            merged, _ = merge_tree(subject_name, subject_name, items, store=STORE, semester=semester)
+        else:
+            merged = merge_file_summaries(subject_name, summaries, semester=semester)
         out_path.write_text(merged, encoding="utf-8")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save summary: {e}")
 
+    try:
+        SEARCH_INDEX.index_summary(out_name, subject_name, merged, summaries, mtime=out_path.stat().st_mtime)
+    except Exception as e:
+        errors.append(f"Search index update failed: {e}")
+
     return {
         "status": "ok",
         "filesProcessed": len(summaries),
         "summary_file": out_name,
         "summary_url": f"/output/{out_name}",
+        "tokensSaved": tokens_saved,
         "errors": errors,
     }
+
+
+def _run_job(job_id: str, req: SummarizeFolderRequest, heartbeat: Heartbeat) -> None:
+    STORE.update_job(job_id, "running")
+    deadline = _request_deadline(req)
+    try:
+        result = _run_summarize(req, deadline)
+    except HTTPException as e:
+        STORE.update_job(job_id, "failed", error=str(e.detail))
+        return
+    except Exception as e:
+        STORE.update_job(job_id, "failed", error=str(e))
+        return
+    finally:
+        deadline.close()
+        heartbeat.stop()
+    STORE.update_job(job_id, "done", result=result)
+
+
+def _run_profiled(req: SummarizeFolderRequest, deadline: Deadline) -> Dict:
+    """
+    Run _run_summarize under RunProfiler and add links to the reports.
+    Only one request is profiled at a time; others run unprofiled.
+    """
+    try:
+        profiler = RunProfiler().start()
+    except RuntimeError as e:
+        result = _run_summarize(req, deadline)
+        result["profile"] = {"error": str(e)}
+        return result
+    try:
+        result = _run_summarize(req, deadline)
+    finally:
+        profiler.stop()
+    name = f"{slugify(req.subjectName)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    paths = profiler.write(OUTPUT_DIR / "profiles" / name)
+    result["profile"] = {
+        key: f"/output/{path.relative_to(OUTPUT_DIR).as_posix()}" for key, path in paths.items()
+    }
+    result["profile"]["peakMemoryMiB"] = round(profiler.peak_bytes / (1024 * 1024), 1)
+    return result
+
+
+async def _run_until_disconnected(request: Request, deadline: Deadline, fn, *args):
+    """
+    Run fn(*args, deadline) in the threadpool. If the client disconnects (or
+    this request is cancelled) first, cancel the deadline so pending files are
+    dropped and in-flight Drive/Gemini calls are aborted.
+    """
+    task = asyncio.ensure_future(run_in_threadpool(fn, *args, deadline))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_S)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                deadline.cancel(CLIENT_DISCONNECTED)
+    finally:
+        if not task.done():
+            deadline.cancel(CLIENT_DISCONNECTED)
+        deadline.close()
+
+
+@app.post("/summarize-folder")
+async def summarize_folder(
+    req: SummarizeFolderRequest,
+    request: Request,
+    x_study_agent_profile: Optional[str] = Header(None),
+):
+    """
+    Summarize a folder. Send `X-Study-Agent-Profile: 1` to also get cProfile,
+    collapsed-stack and tracemalloc reports for this request. The run is
+    cancelled when the client disconnects or the deadline passes.
+    """
+    deadline = _request_deadline(req)
+    if x_study_agent_profile in ("1", "true", "yes"):
+        return await _run_until_disconnected(request, deadline, _run_profiled, req)
+    return await _run_until_disconnected(request, deadline, _run_summarize, req)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(req: SummarizeFolderRequest, background_tasks: BackgroundTasks):
+    """
+    Start a summarization in the background. Job state lives in the shared
+    store, so any worker can answer GET /jobs/{jobId}. This worker renews the
+    job's lease until it finishes; if the worker dies, the job is reported as
+    failed once the lease runs out instead of staying "running" forever.
+    """
+    # SQLite calls run in the thread pool so they never stall the event loop
+    await run_in_threadpool(STORE.sweep_stale_jobs)
+    job_id = await run_in_threadpool(STORE.create_job, jsonable_encoder(req))
+    heartbeat = Heartbeat(lambda: STORE.renew_job(job_id), JOB_LEASE_S / 3).start()
+    background_tasks.add_task(_run_job, job_id, req, heartbeat)
+    return {"jobId": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_in_threadpool(STORE.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,18 +1,34 @@
 from __future__ import annotations
 
 import json
+import threading
 from pathlib import Path
-from typing import Dict
-
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
 
 from .config import get_google_oauth_config, get_defaults
 
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+# The Google client libraries are imported inside the functions that use them:
+# they take a large share of CLI/server startup time and are only needed once
+# Drive is actually contacted.
+
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
 
+_thread_local = threading.local()
+# OAuth credentials shared by every thread's Drive service
+_credentials: Optional[Credentials] = None
+_credentials_lock = threading.Lock()
+# Replaces the real Drive client when set (e.g. fakes for load tests)
+_service_factory: Optional[Callable[[], Any]] = None
+
+
+def set_drive_service_factory(factory: Optional[Callable[[], Any]]) -> None:
+    """Build Drive services with factory instead of OAuth + googleapiclient (None restores it)."""
+    global _service_factory
+    _service_factory = factory
+
 
 def _build_client_config(oauth_cfg: Dict[str, str]) -> Dict:
     return {
@@ -27,6 +43,8 @@ def _build_client_config(oauth_cfg: Dict[str, str]) -> Dict:
 
 
 def _load_credentials(token_path: Path) -> Credentials | None:
+    from google.oauth2.credentials import Credentials
+
     if token_path.exists():
         try:
             return Credentials.from_authorized_user_file(str(token_path), SCOPES)
@@ -40,6 +58,9 @@ def _save_credentials(creds: Credentials, token_path: Path) -> None:
 
 
 def _refresh_or_login(token_path: Path) -> Credentials:
+    from google.auth.transport.requests import Request
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     oauth_cfg = get_google_oauth_config()
     creds = _load_credentials(token_path)
 
@@ -58,9 +79,48 @@ def _refresh_or_login(token_path: Path) -> Credentials:
     return creds
 
 
+def get_credentials() -> Credentials:
+    """
+    Return the process's Drive credentials. token.json is read, refreshed
+    and (if needed) the login flow run by one thread at a time, and only
+    when there are no usable credentials yet, instead of by every worker
+    thread that builds a service.
+    """
+    global _credentials
+    with _credentials_lock:
+        creds = _credentials
+        if creds is not None and not creds.valid:
+            if creds.expired and creds.refresh_token:
+                from google.auth.transport.requests import Request
+
+                defaults = get_defaults()
+                creds.refresh(Request())
+                _save_credentials(creds, Path(defaults["token_path"]))  # type: ignore[arg-type]
+            else:
+                creds = None
+        if creds is None:
+            defaults = get_defaults()
+            creds = _refresh_or_login(Path(defaults["token_path"]))  # type: ignore[arg-type]
+        _credentials = creds
+        return creds
+
+
 def get_drive_service():
-    defaults = get_defaults()
-    token_path = Path(defaults["token_path"])  # type: ignore[arg-type]
-    creds = _refresh_or_login(token_path)
-    service = build("drive", "v3", credentials=creds, cache_discovery=False)
+    if _service_factory is not None:
+        return _service_factory()
+    from googleapiclient.discovery import build
+
+    return build("drive", "v3", credentials=get_credentials(), cache_discovery=False)
+
+
+def get_thread_drive_service():
+    """
+    Return a Drive service owned by the calling thread.
+    googleapiclient services share a single httplib2 connection and are not
+    thread-safe, so each worker thread builds (and then reuses) its own.
+    """
+    service = getattr(_thread_local, "service", None)
+    if service is None:
+        service = get_drive_service()
+        _thread_local.service = service
     return service
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from .deadline import Deadline
+from .store import Heartbeat, Store, owner_id
+
+# How long a worker may go without renewing its lease on a file before others
+# assume it crashed; the holder renews every SUMMARY_LOCK_TTL_S / 3 seconds
+SUMMARY_LOCK_TTL_S = 120.0
+SUMMARY_LOCK_POLL_S = 1.0
+
+
+def revision_key(file: Dict) -> Optional[str]:
+    """
+    Return a key identifying one revision of a Drive file, or None if the
+    listing carried no revision metadata (e.g. a shortcut whose target could
+    not be read).
+    """
+    fid = file.get("id")
+    rev = file.get("md5Checksum") or file.get("version") or file.get("modifiedTime")
+    if not fid or not rev:
+        return None
+    return f"{fid}@{rev}"
+
+
+class FileCache:
+    """
+    Cache of extracted text and per-file summaries, keyed by Drive file
+    revision and kept in the shared SQLite store so every API worker and the
+    CLI see the same entries. Summaries are additionally keyed by model name so
+    switching models does not serve stale output.
+    """
+
+    def __init__(self, store: Store):
+        self.store = store
+
+    def get_text(self, file: Dict) -> Optional[str]:
+        key = revision_key(file)
+        return self.store.cache_get(key, "text") if key else None
+
+    def put_text(self, file: Dict, text: str) -> None:
+        key = revision_key(file)
+        if key:
+            self.store.cache_put(key, "text", text)
+
+    def get_summary(self, file: Dict, model: str) -> Optional[str]:
+        key = revision_key(file)
+        return self.store.cache_get(key, f"summary:{model}") if key else None
+
+    def put_summary(self, file: Dict, model: str, summary: str) -> None:
+        key = revision_key(file)
+        if key:
+            self.store.cache_put(key, f"summary:{model}", summary)
+
+    @contextmanager
+    def claim_summary(
+        self, file: Dict, model: str, deadline: Optional[Deadline] = None
+    ) -> Iterator[Optional[str]]:
+        """
+        Make sure only one worker summarizes a given file revision at a time.
+        Yields the cached summary if one exists (possibly written by another
+        worker while we waited); otherwise yields None and holds the lock until
+        the block exits, during which the caller should compute and put_summary.
+        The lease is renewed in the background while held, so slow summaries
+        are not mistaken for crashed workers. Waiting for another worker stops
+        with Cancelled if the deadline is cancelled.
+        """
+        deadline = deadline or Deadline()
+        key = revision_key(file)
+        if not key:
+            yield None
+            return
+        lock_name = f"summary:{key}:{model}"
+        owner = owner_id()
+        while True:
+            cached = self.get_summary(file, model)
+            if cached is not None:
+                yield cached
+                return
+            if self.store.acquire_lock(lock_name, ttl=SUMMARY_LOCK_TTL_S, owner=owner):
+                break
+            deadline.wait(SUMMARY_LOCK_POLL_S)
+            deadline.check()
+        try:
+            with Heartbeat(
+                lambda: self.store.renew_lock(lock_name, SUMMARY_LOCK_TTL_S, owner=owner),
+                SUMMARY_LOCK_TTL_S / 3,
+            ):
+                # Another worker may have finished between our check and the lock
+                yield self.get_summary(file, model)
+        finally:
+            self.store.release_lock(lock_name, owner=owner)
@@ -30,6 +30,15 @@ def get_gemini_config():
     return {
         "api_key": _get_env("GEMINI_API_KEY", required=True),
         "model": _get_env("GEMINI_MODEL_NAME", default="gemini-pro"),
+        # Requests per minute allowed for the key; used for run planning
+        "rpm": int(_get_env("GEMINI_RPM", default="15") or 15),
+        # Hedged requests: re-issue a slow call once it passes this latency percentile
+        "hedge": (_get_env("GEMINI_HEDGE", default="") or "").lower() in ("1", "true", "yes", "on"),
+        "hedge_percentile": float(_get_env("GEMINI_HEDGE_PERCENTILE", default="0.95") or 0.95),
+        # At most this fraction of calls may be hedged, so cost cannot double
+        "hedge_max_rate": float(_get_env("GEMINI_HEDGE_MAX_RATE", default="0.1") or 0.1),
+        # Comma-separated API roots overriding the Google endpoints (proxies, load tests)
+        "api_roots": [r.strip().rstrip("/") for r in (_get_env("GEMINI_API_ROOTS", default="") or "").split(",") if r.strip()],
     }
 
 
@@ -38,6 +47,19 @@ def get_defaults():
         "default_drive_folder_id": _get_env("DEFAULT_DRIVE_FOLDER_ID", default=None),
         "root_study_folder_id": _get_env("ROOT_STUDY_FOLDER_ID", default=None),
         "root_study_folder_url": _get_env("ROOT_STUDY_FOLDER_URL", default=None),
-        "output_dir": PROJECT_ROOT / "output",
+        "output_dir": Path(_get_env("STUDY_AGENT_OUTPUT_DIR", default=None) or PROJECT_ROOT / "output"),
         "token_path": PROJECT_ROOT / "token.json",
+        # Extracted text and per-file summaries, keyed by Drive revision
+        "cache_dir": Path(_get_env("STUDY_AGENT_CACHE_DIR", default=None) or PROJECT_ROOT / ".cache"),
+        # Number of files summarized in parallel
+        "concurrency": int(_get_env("STUDY_AGENT_CONCURRENCY", default="4") or 4),
+        # Processes for CPU-bound parsing such as PPTX, per API worker
+        # (0 = the CPU cores divided by the number of API workers)
+        "cpu_workers": int(_get_env("STUDY_AGENT_CPU_WORKERS", default="0") or 0),
+        # Merged bullets at least this similar (content-word overlap, 0-1) are collapsed; 1 = exact only
+        "dedupe_threshold": float(_get_env("STUDY_AGENT_DEDUPE_THRESHOLD", default="0.75") or 0.75),
+        # uvicorn worker processes for the API server
+        "workers": int(_get_env("STUDY_AGENT_WORKERS", default="1") or 1),
+        # API requests are cancelled after this many seconds (0 = no limit, the default)
+        "request_timeout": float(_get_env("STUDY_AGENT_REQUEST_TIMEOUT", default="0") or 0),
     }
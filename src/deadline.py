@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+DEADLINE_EXCEEDED = "deadline exceeded"
+CLIENT_DISCONNECTED = "client disconnected"
+
+
+class Cancelled(RuntimeError):
+    """Raised when work is stopped because its Deadline was cancelled or expired."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Cancelled: {reason}")
+        self.reason = reason
+
+
+class Deadline:
+    """
+    Cancellation token for one run, passed down to Drive listing, downloads and
+    Gemini calls. It is cancelled explicitly (client disconnect, Ctrl+C) or
+    when the optional timeout passes. Blocking code calls check() between
+    steps, bounds HTTP timeouts with timeout(), and registers on_cancel()
+    callbacks that abort calls already in flight.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.expires = time.monotonic() + timeout if timeout else None
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        # Held while cancel() runs callbacks, so on_cancel() can wait them out
+        self._running_callbacks = threading.RLock()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+        self._timer: Optional[threading.Timer] = None
+        if timeout:
+            self._timer = threading.Timer(timeout, self.cancel, args=(DEADLINE_EXCEEDED,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.reason == DEADLINE_EXCEEDED
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        with self._running_callbacks:
+            with self._lock:
+                if self._event.is_set():
+                    return
+                self.reason = reason
+                self._event.set()
+                callbacks = list(self._callbacks.values())
+                self._callbacks.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception:
+                    pass
+
+    def close(self) -> None:
+        """Stop the expiry timer once the run is over (does not cancel)."""
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise Cancelled(self.reason or "cancelled")
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None without a time limit."""
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def timeout(self, cap: float) -> float:
+        """Return an HTTP timeout of at most cap that ends with the deadline."""
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return max(0.1, min(cap, remaining))
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to seconds; return True early if cancelled."""
+        return self._event.wait(seconds)
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]) -> Iterator[None]:
+        """
+        Call callback if the deadline is cancelled while the block runs. Once
+        the block has exited the callback is neither running nor called
+        later, so it is safe to release what it would abort (e.g. return a
+        session to a pool).
+        """
+        with self._lock:
+            already = self._event.is_set()
+            if not already:
+                key = self._next_id
+                self._next_id += 1
+                self._callbacks[key] = callback
+        if already:
+            callback()
+        try:
+            yield
+        finally:
+            if not already:
+                with self._lock:
+                    pending = self._callbacks.pop(key, None)
+                if pending is None:
+                    # cancel() already took the callback: wait until it has run
+                    with self._running_callbacks:
+                        pass
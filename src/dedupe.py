@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import random
+import re
+import zlib
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+# Bump when the similarity rules change, so cached folder merges are redone
+DEDUPE_VERSION = 3
+NUM_PERM = 32
+# Lines with fewer content words are only deduplicated exactly
+MIN_WORDS = 3
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_MASK64 = (1 << 64) - 1
+
+# Ignored when comparing wording, so "A stack is LIFO" matches "Stacks are LIFO"
+_STOPWORDS = frozenset(
+    "a an the is are was were be been it its this that these those of to in on at by for from with "
+    "and or as so than then you your we our they their one".split()
+)
+# Numbers, and formula-like terms such as O(n log n) or T(n/2)
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_FORMULA_RE = re.compile(r"\b\w\([^()]*\)")
+# Words that flip the meaning of an otherwise identical bullet
+_CONTRAST_WORDS = frozenset(
+    "max maximum largest min minimum smallest insert insertion add delete deletion remove push pop "
+    "enqueue dequeue best worst average first last before after increase decrease ascending descending "
+    "left right upper lower above below true false not no never stable unstable directed "
+    "undirected weighted unweighted sorted unsorted lifo fifo".split()
+)
+
+
+def _stem(word: str) -> str:
+    # Plural only ("stacks" -> "stack"); enough for bullets rephrased by Gemini
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def _words(line: str) -> List[str]:
+    return [_stem(w) for w in _WORD_RE.findall(line.lower()) if w not in _STOPWORDS]
+
+
+def content_words(line: str) -> FrozenSet[str]:
+    """Content words of line, lowercased and singularized."""
+    return frozenset(_words(line))
+
+
+def subject(line: str) -> str:
+    """
+    First content word, usually what the bullet is about ("AVL tree ...",
+    "Stacks are ..."). Bullets about different subjects are never merged,
+    however much of the rest they share.
+    """
+    words = _words(line)
+    return words[0] if words else ""
+
+
+def key_terms(line: str) -> FrozenSet[str]:
+    """
+    Terms that must match for two bullets to be duplicates however similar
+    the rest is: numbers, formula-like terms and contrast words (max/min,
+    insert/delete, best/worst, not, ...).
+    """
+    lowered = line.lower()
+    terms = set(_NUMBER_RE.findall(lowered))
+    terms.update(re.sub(r"\s+", "", m) for m in _FORMULA_RE.findall(lowered))
+    terms.update(w for w in _WORD_RE.findall(lowered) if w in _CONTRAST_WORDS)
+    return frozenset(terms)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def overlap(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Share of the smaller set's words found in the other (overlap coefficient)."""
+    if not a or not b:
+        return float(a == b)
+    return len(a & b) / min(len(a), len(b))
+
+
+def similar(a: FrozenSet[str], b: FrozenSet[str], threshold: float) -> bool:
+    """
+    Rewordings of one point mostly reuse each other's words but add filler
+    of their own ("the last item in is the first item out" vs "last in,
+    first out"), which Jaccard punishes. So the overlap coefficient must
+    reach threshold, while Jaccard only has to reach half of it, which stops
+    a short bullet from swallowing a long one that says more.
+    """
+    return overlap(a, b) >= threshold and jaccard(a, b) >= threshold / 2
+
+
+class MinHasher:
+    """
+    One-permutation MinHash: each word is hashed once (crc32, then a seeded
+    multiply-shift) and the minimum is kept per bin, so a signature costs
+    O(words) instead of O(words * num_perm). Empty bins are filled from
+    the next non-empty one (rotation densification). Seeded, so signatures are
+    the same in every process.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._a = rng.getrandbits(64) | 1
+        self._b = rng.getrandbits(64)
+
+    def signature(self, words: FrozenSet[str]) -> Tuple[int, ...]:
+        n = self.num_perm
+        bins: List[Optional[int]] = [None] * n
+        a, b = self._a, self._b
+        for s in words:
+            h = ((a * zlib.crc32(s.encode("utf-8")) + b) & _MASK64) >> 16
+            i = h % n
+            v = h // n
+            if bins[i] is None or v < bins[i]:  # type: ignore[operator]
+                bins[i] = v
+        if all(v is None for v in bins):
+            return tuple([0] * n)
+        sig: List[int] = []
+        for i in range(n):
+            j, offset = i, 0
+            while bins[j] is None:
+                j = (j + 1) % n
+                offset += 1
+            sig.append(bins[j] * n + offset)  # type: ignore[operator]
+        return tuple(sig)
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) with bands * rows == num_perm whose S-curve midpoint
+    (1/bands) ** (1/rows) is closest to the Jaccard threshold.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+_hasher = MinHasher()
+
+
+def collapse_near_duplicates(lines: Sequence[str], threshold: float = 0.75) -> List[str]:
+    """
+    Collapse lines that repeat an earlier line in other words. Two lines
+    match when their content words are similar() at threshold and their
+    subject and key terms (numbers, formulas, contrast words such as
+    max/min) are identical. A line also matches the rewordings already
+    collapsed, so a group is not split by which version came first. Each
+    group keeps the position of its first line and the wording with the
+    most content words, so a fuller rewording is not lost to a terse one.
+
+    Candidates come from MinHash/LSH buckets keyed by the subject and key
+    terms as well, so lines that differ only in a number never meet, and the
+    cost grows roughly linearly with the number of lines. Exact
+    (case-insensitive) duplicates are always dropped; a threshold of 1 or
+    more keeps near-duplicates.
+    """
+    # LSH estimates Jaccard, and similar() only needs half the threshold
+    bands, rows = lsh_params(threshold / 2) if threshold < 1 else (0, 0)
+    buckets: List[Dict[Tuple, List[int]]] = [{} for _ in range(bands)]
+    # Content words and group (index into kept) of every line compared so far
+    members: List[Tuple[FrozenSet[str], int]] = []
+    kept: List[str] = []
+    kept_sizes: List[int] = []
+    seen = set()
+    for line in lines:
+        key = line.strip().lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        words = content_words(line)
+        if not bands or len(words) < MIN_WORDS:
+            kept.append(line)
+            kept_sizes.append(len(words))
+            continue
+        sig = _hasher.signature(words)
+        scope = (subject(line), key_terms(line))
+        band_keys = [(scope, sig[i * rows:(i + 1) * rows]) for i in range(bands)]
+        candidates = set()
+        for bucket, band_key in zip(buckets, band_keys):
+            candidates.update(bucket.get(band_key, ()))
+        group = next((members[c][1] for c in sorted(candidates) if similar(words, members[c][0], threshold)), None)
+        if group is None:
+            group = len(kept)
+            kept.append(line)
+            kept_sizes.append(len(words))
+        elif len(words) > kept_sizes[group]:
+            kept[group] = line
+            kept_sizes[group] = len(words)
+        for bucket, band_key in zip(buckets, band_keys):
+            bucket.setdefault(band_key, []).append(len(members))
+        members.append((words, group))
+    return kept
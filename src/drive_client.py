@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import hashlib
 import io
-from typing import Dict, List
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Collection, Dict, List, Optional
 
-from googleapiclient.discovery import Resource
-from googleapiclient.http import MediaIoBaseDownload
-from pptx import Presentation
+from .deadline import Deadline
+
+if TYPE_CHECKING:
+    from googleapiclient.discovery import Resource
+
+# googleapiclient.http and pptx (which pulls in lxml and PIL) are imported on
+# first use so folders without PowerPoint files never pay for them.
 
 MIME_FOLDER = "application/vnd.google-apps.folder"
 MIME_GOOGLE_DOC = "application/vnd.google-apps.document"
@@ -15,19 +24,62 @@ MIME_PPTX = "application/vnd.openxmlformats-officedocument.presentationml.presen
 MIME_PPT = "application/vnd.ms-powerpoint"
 MIME_SHORTCUT = "application/vnd.google-apps.shortcut"
 
+# File types picked up by list_study_files unless the caller passes its own
+# (extractors.list_supported_files passes the extractor registry's types)
+STUDY_MIME_TYPES = frozenset({MIME_PDF, MIME_GOOGLE_DOC, MIME_GOOGLE_SLIDES, MIME_PPTX, MIME_PPT})
+
+# Binary files at least this large are downloaded as parallel byte ranges
+RANGED_DOWNLOAD_MIN_BYTES = 8 * 1024 * 1024
+RANGED_CHUNK_BYTES = 4 * 1024 * 1024
+RANGED_DOWNLOAD_WORKERS = 4
+# Attempts per byte range for throttling, 5xx and transport errors
+RANGED_RANGE_ATTEMPTS = 3
+RANGED_RETRY_BACKOFF_S = 1.0
+# Used when the service does not carry its own base URL (googleapiclient sets _baseUrl)
+DRIVE_API_URL = "https://www.googleapis.com/drive/v3/"
+
+# Authorized download sessions, one per credentials object
+_sessions: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_sessions_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+class RangedDownloadError(RuntimeError):
+    """A ranged download could not be completed; the sequential path may still work."""
+
 
-def list_study_files(service: Resource, folder_id: str) -> List[Dict]:
+class _RetryableRangeError(RangedDownloadError):
+    """A range failed in a way that may succeed if requested again (429, 5xx, short read)."""
+
+
+class ChecksumMismatch(RuntimeError):
+    """Downloaded bytes do not match the md5Checksum from the Drive listing."""
+
+
+def list_study_files(
+    service: Resource,
+    folder_id: str,
+    deadline: Optional[Deadline] = None,
+    mime_types: Optional[Collection[str]] = None,
+) -> List[Dict]:
+    deadline = deadline or Deadline()
+    allowed = STUDY_MIME_TYPES if mime_types is None else mime_types
     results: List[Dict] = []
 
-    def _recurse(fid: str):
+    # folderPath: names of the folders between folder_id and the file;
+    # folderIds: their ids, which (unlike names) are unique among siblings
+    def _recurse(fid: str, path: List[str], ids: List[str]):
         page_token = None
         while True:
+            deadline.check()
             resp = (
                 service.files()
                 .list(
                     q=f"'{fid}' in parents and trashed=false",
                     fields=(
-                        "nextPageToken, files(id, name, mimeType, "
+                        "nextPageToken, files(id, name, mimeType, size, md5Checksum, "
+                        "version, modifiedTime, "
                         "shortcutDetails(targetId, targetMimeType))"
                     ),
                     pageToken=page_token,
@@ -40,42 +92,228 @@ def list_study_files(service: Resource, folder_id: str) -> List[Dict]:
             for item in resp.get("files", []):
                 mt = item.get("mimeType")
                 if mt == MIME_FOLDER:
-                    _recurse(item["id"])  # type: ignore[index]
-                elif mt in (MIME_PDF, MIME_GOOGLE_DOC, MIME_GOOGLE_SLIDES, MIME_PPTX, MIME_PPT):
+                    _recurse(item["id"], path + [item.get("name", "Untitled")], ids + [item["id"]])  # type: ignore[index]
+                elif mt in allowed:
                     results.append({
                         "id": item["id"],
                         "name": item.get("name", "Untitled"),
                         "mimeType": mt,
+                        # Google-native files (Docs/Slides) have no size
+                        "size": int(item.get("size") or 0),
+                        "md5Checksum": item.get("md5Checksum"),
+                        "version": item.get("version"),
+                        "modifiedTime": item.get("modifiedTime"),
+                        "folderPath": path,
+                        "folderIds": ids,
                     })
                 elif mt == MIME_SHORTCUT:
                     sc = item.get("shortcutDetails", {}) or {}
                     target_id = sc.get("targetId")
                     target_mt = sc.get("targetMimeType")
-                    if target_id and target_mt in (MIME_PDF, MIME_GOOGLE_DOC, MIME_GOOGLE_SLIDES, MIME_PPTX, MIME_PPT):
+                    if target_id and target_mt in allowed:
+                        # The shortcut itself carries no revision of its
+                        # target; without one the file is never cached or
+                        # locked (see cache.revision_key)
+                        target = _shortcut_target(service, target_id, deadline)
                         results.append({
                             "id": target_id,
                             "name": item.get("name", "Untitled"),
                             "mimeType": target_mt,
+                            "size": int(target.get("size") or 0),
+                            "md5Checksum": target.get("md5Checksum"),
+                            "version": target.get("version"),
+                            "modifiedTime": target.get("modifiedTime"),
+                            "folderPath": path,
+                            "folderIds": ids,
                         })
             page_token = resp.get("nextPageToken")
             if not page_token:
                 break
 
-    _recurse(folder_id)
+    _recurse(folder_id, [], [])
     return results
 
 
-def download_pdf(service: Resource, file_id: str) -> bytes:
+def _shortcut_target(service: Resource, file_id: str, deadline: Deadline) -> Dict:
+    """
+    Size and revision fields of a shortcut's target, or {} if the target
+    cannot be read (it is then listed as before and fails on download).
+    """
+    from googleapiclient.errors import HttpError
+
+    deadline.check()
+    try:
+        return (
+            service.files()
+            .get(fileId=file_id, fields="size, md5Checksum, version, modifiedTime", supportsAllDrives=True)
+            .execute()
+        )
+    except HttpError as e:
+        logger.warning("Could not read shortcut target %s: %s", file_id, e)
+        return {}
+
+
+def _download_sequential(service: Resource, file_id: str, deadline: Deadline) -> bytes:
+    from googleapiclient.http import MediaIoBaseDownload
+
     request = service.files().get_media(fileId=file_id)
     fh = io.BytesIO()
-    downloader = MediaIoBaseDownload(fh, request)
+    # Chunked so a cancelled run stops between chunks
+    downloader = MediaIoBaseDownload(fh, request, chunksize=RANGED_CHUNK_BYTES)
     done = False
     while not done:
+        deadline.check()
         _, done = downloader.next_chunk()
     return fh.getvalue()
 
 
-def export_google_doc_as_text(service: Resource, file_id: str) -> str:
+def _authorized_session(service: Resource):
+    """
+    Return a pooled requests session authorized with the service's credentials,
+    shared by all downloads that use the same credentials.
+    """
+    creds = getattr(getattr(service, "_http", None), "credentials", None)
+    if creds is None:
+        return None
+    with _sessions_lock:
+        session = _sessions.get(creds)
+        if session is None:
+            from google.auth.transport.requests import AuthorizedSession
+            from requests.adapters import HTTPAdapter
+
+            session = AuthorizedSession(creds)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=RANGED_DOWNLOAD_WORKERS * 4)
+            session.mount("https://", adapter)
+            _sessions[creds] = session
+        return session
+
+
+def _media_url(service: Resource, file_id: str) -> str:
+    """alt=media URL for file_id on the service's endpoint."""
+    base = getattr(service, "_baseUrl", None) or DRIVE_API_URL
+    return f"{base}files/{file_id}?alt=media&supportsAllDrives=true"
+
+
+def _download_ranged(
+    session, url: str, file_id: str, size: int, md5: Optional[str], deadline: Deadline
+) -> bytearray:
+    """
+    Fetch byte ranges concurrently into a preallocated buffer and verify the
+    result against Drive's md5Checksum. The buffer itself is returned, so the
+    file is held in memory once. A range that hits 429, 5xx, a short read or
+    a transport error is requested again up to RANGED_RANGE_ATTEMPTS times
+    (finished ranges are kept), and stops at the next chunk once the
+    deadline is cancelled. Raises RangedDownloadError when the server does
+    not serve ranges (it ignored Range, 416) or a range keeps failing,
+    requests.HTTPError for other HTTP errors such as 401/403/404, and
+    ChecksumMismatch if the assembled file is corrupt.
+    """
+    import requests
+
+    buf = bytearray(size)
+    view = memoryview(buf)
+
+    def _fetch_range(start: int, end: int) -> None:
+        resp = session.get(
+            url, headers={"Range": f"bytes={start}-{end}"}, timeout=deadline.timeout(120), stream=True
+        )
+        try:
+            if resp.status_code != 206:
+                if resp.status_code == 429 or resp.status_code >= 500:
+                    raise _RetryableRangeError(f"Ranged download failed with HTTP {resp.status_code}")
+                if resp.status_code in (200, 416):
+                    raise RangedDownloadError(f"Ranged download failed with HTTP {resp.status_code}")
+                # Auth and not-found errors would fail the sequential path too
+                resp.raise_for_status()
+                raise RangedDownloadError(f"Unexpected HTTP {resp.status_code} for a ranged download")
+            pos = start
+            for chunk in resp.iter_content(chunk_size=256 * 1024):
+                deadline.check()
+                view[pos:pos + len(chunk)] = chunk
+                pos += len(chunk)
+            if pos != end + 1:
+                raise _RetryableRangeError(f"Short read for bytes {start}-{end}")
+        finally:
+            resp.close()
+
+    def _fetch(start: int) -> None:
+        end = min(start + RANGED_CHUNK_BYTES, size) - 1
+        backoff = RANGED_RETRY_BACKOFF_S
+        for attempt in range(1, RANGED_RANGE_ATTEMPTS + 1):
+            try:
+                return _fetch_range(start, end)
+            except (
+                _RetryableRangeError,
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ) as e:
+                if attempt == RANGED_RANGE_ATTEMPTS:
+                    raise
+                logger.info("Retrying bytes %d-%d of %s (%s)", start, end, file_id, e)
+            if deadline.wait(backoff):
+                deadline.check()
+            backoff *= 2
+
+    with ThreadPoolExecutor(max_workers=RANGED_DOWNLOAD_WORKERS) as pool:
+        # list() re-raises the first failed range
+        list(pool.map(_fetch, range(0, size, RANGED_CHUNK_BYTES)))
+    if md5 and hashlib.md5(buf).hexdigest() != md5:
+        raise ChecksumMismatch(
+            f"Checksum mismatch for {file_id} after ranged download (was the file changed during the run?)"
+        )
+    return buf
+
+
+def download_media(
+    service: Resource,
+    file_id: str,
+    size: int = 0,
+    md5: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+) -> bytes:
+    """
+    Download a binary (non-Google-native) file. Files of at least
+    RANGED_DOWNLOAD_MIN_BYTES with a known size are fetched as parallel byte
+    ranges; smaller files use the sequential MediaIoBaseDownload path, and so
+    do ranged downloads that fail on the transport or range level (logged).
+    Auth errors and checksum mismatches are raised, not retried. Raises
+    Cancelled if the deadline is cancelled.
+    """
+    deadline = deadline or Deadline()
+    deadline.check()
+    if size >= RANGED_DOWNLOAD_MIN_BYTES:
+        session = _authorized_session(service)
+        if session is not None:
+            import requests
+
+            try:
+                return _download_ranged(session, _media_url(service, file_id), file_id, size, md5, deadline)
+            except (
+                RangedDownloadError,
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ) as e:
+                # Do not fall back to a full download for a cancelled run
+                deadline.check()
+                logger.warning("Ranged download of %s failed (%s); downloading sequentially", file_id, e)
+    return _download_sequential(service, file_id, deadline)
+
+
+def download_pdf(
+    service: Resource,
+    file_id: str,
+    size: int = 0,
+    md5: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+) -> bytes:
+    return download_media(service, file_id, size=size, md5=md5, deadline=deadline)
+
+
+def export_google_doc_as_text(service: Resource, file_id: str, deadline: Optional[Deadline] = None) -> str:
+    if deadline is not None:
+        deadline.check()
     data = (
         service.files()
         .export(fileId=file_id, mimeType="text/plain")
@@ -87,18 +325,34 @@ def export_google_doc_as_text(service: Resource, file_id: str) -> str:
     return str(data)
 
 
-def download_pptx(service: Resource, file_id: str) -> bytes:
-    request = service.files().get_media(fileId=file_id)
-    fh = io.BytesIO()
-    downloader = MediaIoBaseDownload(fh, request)
-    done = False
-    while not done:
-        _, done = downloader.next_chunk()
-    return fh.getvalue()
+def download_pptx(
+    service: Resource,
+    file_id: str,
+    size: int = 0,
+    md5: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+) -> bytes:
+    return download_media(service, file_id, size=size, md5=md5, deadline=deadline)
+
 
+def extract_pptx_text(
+    service: Resource,
+    file_id: str,
+    size: int = 0,
+    md5: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+) -> str:
+    data = download_pptx(service, file_id, size=size, md5=md5, deadline=deadline)
+    return pptx_bytes_to_text(data)
+
+
+def pptx_bytes_to_text(data: bytes) -> str:
+    """
+    Extract slide text, table cells and speaker notes from a .pptx file.
+    CPU-bound and free of Drive state, so it can run in a worker process.
+    """
+    from pptx import Presentation
 
-def extract_pptx_text(service: Resource, file_id: str) -> str:
-    data = download_pptx(service, file_id)
     prs = Presentation(io.BytesIO(data))
     lines: List[str] = []
     for slide in prs.slides:
@@ -124,22 +378,23 @@ def extract_pptx_text(service: Resource, file_id: str) -> str:
                                 part = part.strip()
                                 if part:
                                     lines.append(part)
-        # Speaker notes, if any
+        # Speaker notes, if any (has_notes_slide avoids creating an empty one)
         notes = None
-        try:
-            if hasattr(slide, "notes_slide") and slide.notes_slide and slide.notes_slide.notes_text_frame:
-                notes = slide.notes_slide.notes_text_frame.text
-        except Exception:
-            notes = None
+        if slide.has_notes_slide and slide.notes_slide.notes_text_frame is not None:
+            notes = slide.notes_slide.notes_text_frame.text
         if notes:
             for part in notes.splitlines():
                 part = part.strip()
                 if part:
                     lines.append(part)
+        # Form feed marks the slide boundary (used to spot repeated footers)
+        lines.append("\f")
     return "\n".join(lines)
 
 
-def export_google_slides_as_text(service: Resource, file_id: str) -> str:
+def export_google_slides_as_text(service: Resource, file_id: str, deadline: Optional[Deadline] = None) -> str:
+    if deadline is not None:
+        deadline.check()
     data = (
         service.files()
         .export(fileId=file_id, mimeType="text/plain")
@@ -150,7 +405,9 @@ def export_google_slides_as_text(service: Resource, file_id: str) -> str:
     return str(data)
 
 
-def export_google_slides_as_pdf(service: Resource, file_id: str) -> bytes:
+def export_google_slides_as_pdf(service: Resource, file_id: str, deadline: Optional[Deadline] = None) -> bytes:
+    if deadline is not None:
+        deadline.check()
     data = (
         service.files()
         .export(fileId=file_id, mimeType="application/pdf")
@@ -199,9 +456,14 @@ def get_folder_name(service: Resource, folder_id: str) -> str:
     return meta.get("name", folder_id)
 
 
-def collect_files_recursively(service: Resource, folder_id: str) -> List[Dict]:
+def collect_files_recursively(
+    service: Resource,
+    folder_id: str,
+    deadline: Optional[Deadline] = None,
+    mime_types: Optional[Collection[str]] = None,
+) -> List[Dict]:
     """
     Recursively walk starting from folder_id and collect all PDF + Google Doc files.
     Uses the existing list_study_files recursion.
     """
-    return list_study_files(service, folder_id)
+    return list_study_files(service, folder_id, deadline=deadline, mime_types=mime_types)
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, List, Optional
+
+from .cache import FileCache
+from .deadline import Deadline
+from .drive_client import (
+    MIME_GOOGLE_DOC,
+    MIME_GOOGLE_SLIDES,
+    MIME_PDF,
+    MIME_PPT,
+    MIME_PPTX,
+    collect_files_recursively,
+    download_pdf,
+    download_pptx,
+    export_google_doc_as_text,
+    export_google_slides_as_pdf,
+    export_google_slides_as_text,
+    pptx_bytes_to_text,
+)
+
+if TYPE_CHECKING:
+    from googleapiclient.discovery import Resource
+
+# Where an extractor's parse step runs
+IO = "io"  # inline on the scheduler's I/O thread
+CPU = "cpu"  # in the process pool, so it never holds the GIL the I/O threads need
+
+
+class Unsupported(Exception):
+    """Raised for file types that have no extractor, or one that refuses them."""
+
+
+class Content:
+    """
+    Gemini input for one file: extracted text (cleaned and sent as text) or a
+    PDF sent inline. paged marks text split into slides, whose repeated
+    footers and page numbers can be stripped.
+    """
+
+    def __init__(self, text: Optional[str] = None, pdf: Optional[bytes] = None, paged: bool = False):
+        self.text = text
+        self.pdf = pdf
+        self.paged = paged
+
+    @property
+    def empty(self) -> bool:
+        return not (self.pdf or (self.text and self.text.strip()))
+
+
+class Extractor(ABC):
+    """
+    Turns one Drive file type into Content in two steps:
+    - fetch(service, file, deadline) does the Drive I/O on a scheduler thread,
+    - parse(data) turns the fetched payload into Content. With kind=CPU it runs
+      in the process pool, so the extractor must be picklable and parse must
+      not touch Drive, the cache or other process state.
+    The default parse passes through a fetch that already returned Content.
+    Extractors whose text is split into slides set paged.
+    """
+
+    kind = IO
+    paged = False
+
+    @abstractmethod
+    def fetch(self, service: Resource, file: Dict, deadline: Deadline) -> Any:
+        ...
+
+    def parse(self, data: Any) -> Content:
+        return data
+
+
+class PdfExtractor(Extractor):
+    def fetch(self, service: Resource, file: Dict, deadline: Deadline) -> Content:
+        return Content(pdf=download_pdf(
+            service, file["id"], size=file.get("size") or 0, md5=file.get("md5Checksum"), deadline=deadline
+        ))
+
+
+class GoogleDocExtractor(Extractor):
+    def fetch(self, service: Resource, file: Dict, deadline: Deadline) -> Content:
+        return Content(text=export_google_doc_as_text(service, file["id"], deadline=deadline))
+
+
+class GoogleSlidesExtractor(Extractor):
+    paged = True
+
+    # Prefer text export for concise summaries; fall back to PDF if it is empty
+    def fetch(self, service: Resource, file: Dict, deadline: Deadline) -> Content:
+        text = export_google_slides_as_text(service, file["id"], deadline=deadline)
+        if text and text.strip():
+            return Content(text=text)
+        return Content(pdf=export_google_slides_as_pdf(service, file["id"], deadline=deadline))
+
+
+class PptxExtractor(Extractor):
+    kind = CPU
+    paged = True
+
+    def fetch(self, service: Resource, file: Dict, deadline: Deadline) -> bytes:
+        return download_pptx(
+            service, file["id"], size=file.get("size") or 0, md5=file.get("md5Checksum"), deadline=deadline
+        )
+
+    def parse(self, data: bytes) -> Content:
+        return Content(text=pptx_bytes_to_text(data))
+
+
+class UnsupportedExtractor(Extractor):
+    def __init__(self, reason: str):
+        self.reason = reason
+
+    def fetch(self, service: Resource, file: Dict, deadline: Deadline) -> Any:
+        raise Unsupported(self.reason)
+
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register_extractor(mime_type: str, extractor: Extractor) -> None:
+    """Register (or replace) the extractor for a MIME type; list_supported_files picks the type up too."""
+    EXTRACTORS[mime_type] = extractor
+
+
+register_extractor(MIME_PDF, PdfExtractor())
+register_extractor(MIME_GOOGLE_DOC, GoogleDocExtractor())
+register_extractor(MIME_GOOGLE_SLIDES, GoogleSlidesExtractor())
+register_extractor(MIME_PPTX, PptxExtractor())
+register_extractor(
+    MIME_PPT,
+    UnsupportedExtractor("Legacy .ppt files are not supported. Convert to Google Slides or .pptx for best results."),
+)
+
+
+def get_extractor(mime_type: str) -> Extractor:
+    extractor = EXTRACTORS.get(mime_type)
+    if extractor is None:
+        raise Unsupported(f"No extractor for {mime_type or 'unknown type'}")
+    return extractor
+
+
+def is_paged(mime_type: str) -> bool:
+    """Whether text extracted for mime_type is split into slides."""
+    extractor = EXTRACTORS.get(mime_type)
+    return extractor is not None and extractor.paged
+
+
+def supported_mime_types() -> FrozenSet[str]:
+    return frozenset(EXTRACTORS)
+
+
+def list_supported_files(service: Resource, folder_id: str, deadline: Optional[Deadline] = None) -> List[Dict]:
+    """Recursively list the files under folder_id that have a registered extractor."""
+    return collect_files_recursively(service, folder_id, deadline=deadline, mime_types=supported_mime_types())
+
+
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+_cpu_pool_lock = threading.Lock()
+
+
+def _cpu_workers() -> int:
+    """
+    STUDY_AGENT_CPU_WORKERS, or the CPU cores split between the uvicorn
+    workers (STUDY_AGENT_WORKERS): every worker process has its own pool, so
+    one pool per core each would oversubscribe the machine.
+    """
+    from .config import get_defaults
+
+    defaults = get_defaults()
+    return defaults["cpu_workers"] or max(1, (os.cpu_count() or 1) // max(1, defaults["workers"]))
+
+
+def cpu_pool() -> ProcessPoolExecutor:
+    """
+    Return the process-wide pool for CPU-bound parsing. Workers are spawned
+    (not forked) because the parent already runs threads and SQLite
+    connections, and spawn works the same on Windows.
+    """
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is None:
+            _cpu_pool = ProcessPoolExecutor(
+                max_workers=_cpu_workers(), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _cpu_pool
+
+
+def _reset_cpu_pool(broken: ProcessPoolExecutor) -> None:
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is broken:
+            _cpu_pool = None
+    broken.shutdown(wait=False)
+
+
+def _parse(extractor: Extractor, data: Any, deadline: Deadline) -> Content:
+    if extractor.kind != CPU:
+        return extractor.parse(data)
+    deadline.check()
+    pool = cpu_pool()
+    try:
+        future = pool.submit(extractor.parse, data)
+    except (BrokenProcessPool, RuntimeError):
+        # Pool died (e.g. a worker was killed) or is shutting down: parse here
+        _reset_cpu_pool(pool)
+        return extractor.parse(data)
+    with deadline.on_cancel(future.cancel):
+        try:
+            return future.result()
+        except CancelledError:
+            deadline.check()
+            raise
+        except BrokenProcessPool:
+            _reset_cpu_pool(pool)
+            deadline.check()
+            return extractor.parse(data)
+
+
+def extract(
+    service: Resource,
+    file: Dict,
+    cache: Optional[FileCache] = None,
+    deadline: Optional[Deadline] = None,
+) -> Content:
+    """
+    Return the Gemini input for a Drive file, reusing cached extracted text.
+    Text results are cached by revision. Raises Unsupported for types without
+    an extractor and Cancelled if the deadline is cancelled.
+    """
+    deadline = deadline or Deadline()
+    extractor = get_extractor(file.get("mimeType", ""))
+    if cache is not None:
+        text = cache.get_text(file)
+        if text:
+            return Content(text=text, paged=extractor.paged)
+    content = _parse(extractor, extractor.fetch(service, file, deadline), deadline)
+    content.paged = extractor.paged
+    if cache is not None and content.text and content.text.strip():
+        cache.put_text(file, content.text)
+    return content
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
 import base64
+import queue
+import threading
 import time
-from typing import Any, Dict, Optional
-
-import requests
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional
 
 from .config import get_gemini_config
+from .deadline import Deadline
+
+if TYPE_CHECKING:
+    import requests
+
+    from .abortable import AbortableSession
+
+# requests (and the abortable session built on it) is imported on first use to
+# keep CLI and server startup fast.
 
 # Try v1 first, then v1beta as a fallback (accounts/keys may differ in availability)
 API_ROOTS = [
@@ -31,56 +43,306 @@ PROMPT_TEMPLATE = (
 )
 
 
+def _text_contents(text: str, file_name: str) -> Dict[str, Any]:
+    return {
+        "role": "user",
+        "parts": [
+            {"text": PROMPT_TEMPLATE.format(file_name=file_name)},
+            {"text": text},
+        ],
+    }
+
+
+class LatencyTracker:
+    """
+    Sliding window of recent call latencies: successful calls, plus the time
+    a losing hedged attempt had run before it was aborted. threshold()
+    returns the configured percentile, or a conservative default until
+    enough samples exist.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        window: int = 200,
+        min_samples: int = 10,
+        default_s: float = 30.0,
+        floor_s: float = 2.0,
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_s = default_s
+        self.floor_s = floor_s
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def threshold(self) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return self.default_s
+        idx = min(len(samples) - 1, int(self.percentile * len(samples)))
+        return max(self.floor_s, samples[idx])
+
+
+class HedgeBudget:
+    """
+    Caps hedged calls to a fraction of all calls. One hedge is always
+    allowed, so short runs are not left without any.
+    """
+
+    def __init__(self, max_rate: float = 0.1):
+        self.max_rate = max_rate
+        self.calls = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def try_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges >= max(1.0, self.max_rate * self.calls):
+                return False
+            self.hedges += 1
+            return True
+
+
+class HedgeState:
+    """
+    What hedging learns and uses across calls: the latency tracker, the hedge
+    budget and the executor attempts run on. Share one between clients (the
+    API keeps one per process), so a new client starts from the latencies
+    already seen instead of the conservative defaults.
+    """
+
+    def __init__(self, percentile: float = 0.95, max_rate: float = 0.1):
+        self.latency = LatencyTracker(percentile=percentile)
+        self.budget = HedgeBudget(max_rate=max_rate)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="gemini-hedge")
+            return self._pool
+
+
+class _Attempt:
+    """
+    One call (with its retries) on its own session. cancel() and finish() are
+    serialized, so a cancel that arrives after the attempt finished cannot
+    abort a session that has already gone back to the idle pool.
+    """
+
+    def __init__(self, session: AbortableSession):
+        self.session = session
+        self.cancelled = threading.Event()
+        self.future: Optional[Future] = None
+        # When the current HTTP call started (None before the first one)
+        self.started: Optional[float] = None
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            self.cancelled.set()
+            self.session.abort()
+
+    def finish(self) -> bool:
+        """Mark the attempt as done; return True if its session can be reused."""
+        with self._lock:
+            self._finished = True
+            return not (self.cancelled.is_set() or self.session.aborted)
+
+
 class GeminiClient:
-    def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        hedge: Optional[bool] = None,
+        hedging: Optional[HedgeState] = None,
+    ):
         cfg = get_gemini_config()
         self.api_key = api_key or cfg["api_key"]
         self.model = model_name or cfg["model"]
-        self.session = requests.Session()
+        self.api_roots: List[str] = cfg["api_roots"] or API_ROOTS
+        self._session: Optional[requests.Session] = None
+        self.hedge = cfg["hedge"] if hedge is None else hedge
+        self.hedging = hedging or HedgeState(cfg["hedge_percentile"], cfg["hedge_max_rate"])
+        # Each attempt gets its own abortable session so a losing hedge can be
+        # cut off without disturbing other in-flight calls
+        self._idle_sessions: "queue.SimpleQueue[AbortableSession]" = queue.SimpleQueue()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+        return self._session
+
+    def _acquire_session(self) -> AbortableSession:
+        while True:
+            try:
+                session = self._idle_sessions.get_nowait()
+            except queue.Empty:
+                from .abortable import AbortableSession
+
+                return AbortableSession()
+            # Aborted sessions refuse requests; drop any that slipped into the pool
+            if not session.aborted:
+                return session
 
-    def _generate(self, contents: Dict[str, Any], max_retries: int = 3) -> str:
+    def _release_session(self, attempt_state: _Attempt) -> None:
+        if attempt_state.finish():
+            self._idle_sessions.put(attempt_state.session)
+
+    def _generate(self, contents: Dict[str, Any], max_retries: int = 3, deadline: Optional[Deadline] = None) -> str:
+        """
+        Call generateContent. If the deadline is cancelled, in-flight calls are
+        aborted and Cancelled is raised instead of the transport error.
+        """
+        deadline = deadline or Deadline()
+        deadline.check()
         payload = {"contents": [contents]}
+        try:
+            if not self.hedge:
+                return self._attempt(payload, self.api_roots, max_retries, _Attempt(self._acquire_session()), deadline)
+            return self._generate_hedged(payload, max_retries, deadline)
+        except Exception:
+            deadline.check()
+            raise
+
+    def _generate_hedged(self, payload: Dict[str, Any], max_retries: int, deadline: Deadline) -> str:
+        """
+        Send the request; if it has not returned by the tracked latency
+        percentile, send a duplicate against the roots in reverse order. The
+        first successful response wins and the other attempt is aborted.
+        """
+        executor = self.hedging.executor()
+        latency, budget = self.hedging.latency, self.hedging.budget
+        primary = _Attempt(self._acquire_session())
+        primary.future = executor.submit(self._attempt, payload, self.api_roots, max_retries, primary, deadline)
+        budget.record_call()
+        try:
+            return primary.future.result(timeout=latency.threshold())
+        except FuturesTimeout:
+            pass
+        if deadline.cancelled or not budget.try_hedge():
+            return primary.future.result()
+
+        hedge = _Attempt(self._acquire_session())
+        hedge.future = executor.submit(
+            self._attempt, payload, list(reversed(self.api_roots)), max_retries, hedge, deadline
+        )
+        pending = {primary.future: primary, hedge.future: hedge}
+        last_exc: Optional[BaseException] = None
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for fut in done:
+                pending.pop(fut)
+                exc = fut.exception()
+                if exc is None:
+                    for loser in pending.values():
+                        # The loser's call took at least this long; leaving it
+                        # out would bias the tracker towards fast calls
+                        if loser.started is not None:
+                            latency.record(time.monotonic() - loser.started)
+                        loser.cancel()
+                    return fut.result()
+                last_exc = exc
+        assert last_exc is not None
+        raise last_exc
+
+    def _attempt(
+        self,
+        payload: Dict[str, Any],
+        roots: List[str],
+        max_retries: int,
+        attempt_state: "_Attempt",
+        deadline: Deadline,
+    ) -> str:
+        session = attempt_state.session
         backoff = 2
         last_err = None
-        for root in API_ROOTS:
-            url = f"{root}/models/{self.model}:generateContent?key={self.api_key}"
-            for attempt in range(max_retries):
-                resp = self.session.post(url, json=payload, timeout=90)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    try:
-                        parts = data["candidates"][0]["content"]["parts"]
-                        text = "".join(p.get("text", "") for p in parts)
-                        if text.strip():
-                            return text
-                    except Exception:
-                        pass
-                    raise RuntimeError(f"Gemini returned unexpected response: {data}")
-                if resp.status_code in (429, 500, 502, 503, 504) and attempt < max_retries - 1:
-                    time.sleep(backoff)
-                    backoff *= 2
-                    continue
-                try:
-                    last_err = resp.json()
-                except Exception:
-                    last_err = resp.text
-                # break retry loop for this root on 4xx except 429
-                if resp.status_code < 500 and resp.status_code != 429:
-                    break
-            # try next root if available
-        raise RuntimeError(f"Gemini API error: {last_err}")
-
-    def summarize_plain_text(self, text: str, file_name: str) -> str:
-        contents = {
-            "role": "user",
-            "parts": [
-                {"text": PROMPT_TEMPLATE.format(file_name=file_name)},
-                {"text": text},
-            ],
-        }
-        return self._generate(contents)
+        try:
+            # Cancelling the deadline aborts this attempt's socket mid-request
+            with deadline.on_cancel(attempt_state.cancel):
+                for root in roots:
+                    url = f"{root}/models/{self.model}:generateContent?key={self.api_key}"
+                    for attempt in range(max_retries):
+                        if attempt_state.cancelled.is_set():
+                            from .abortable import RequestAborted
+
+                            raise RequestAborted("Gemini request cancelled")
+                        started = attempt_state.started = time.monotonic()
+                        resp = session.post(url, json=payload, timeout=deadline.timeout(90))
+                        if resp.status_code == 200:
+                            data = resp.json()
+                            try:
+                                parts = data["candidates"][0]["content"]["parts"]
+                                text = "".join(p.get("text", "") for p in parts)
+                                if text.strip():
+                                    # Latency of this HTTP call only, without earlier retries or backoff
+                                    self.hedging.latency.record(time.monotonic() - started)
+                                    return text
+                            except Exception:
+                                pass
+                            raise RuntimeError(f"Gemini returned unexpected response: {data}")
+                        if resp.status_code in (429, 500, 502, 503, 504) and attempt < max_retries - 1:
+                            # Interruptible sleep so a cancelled attempt stops promptly
+                            attempt_state.cancelled.wait(backoff)
+                            backoff *= 2
+                            continue
+                        try:
+                            last_err = resp.json()
+                        except Exception:
+                            last_err = resp.text
+                        # break retry loop for this root on 4xx except 429
+                        if resp.status_code < 500 and resp.status_code != 429:
+                            break
+                    # try next root if available
+                raise RuntimeError(f"Gemini API error: {last_err}")
+        finally:
+            # The on_cancel callback is unregistered by now; finish() also
+            # turns any cancel still racing with us into a no-op
+            self._release_session(attempt_state)
+
+    def count_tokens(self, contents: Dict[str, Any]) -> int:
+        """
+        Return the input token count for contents using the countTokens endpoint.
+        Nothing is generated, so this does not consume generation quota.
+        """
+        payload = {"contents": [contents]}
+        last_err = None
+        for root in self.api_roots:
+            url = f"{root}/models/{self.model}:countTokens?key={self.api_key}"
+            resp = self.session.post(url, json=payload, timeout=30)
+            if resp.status_code == 200:
+                return int(resp.json().get("totalTokens", 0))
+            try:
+                last_err = resp.json()
+            except Exception:
+                last_err = resp.text
+        raise RuntimeError(f"Gemini countTokens error: {last_err}")
+
+    def count_text_tokens(self, text: str, file_name: str) -> int:
+        return self.count_tokens(_text_contents(text, file_name))
+
+    def summarize_plain_text(self, text: str, file_name: str, deadline: Optional[Deadline] = None) -> str:
+        return self._generate(_text_contents(text, file_name), deadline=deadline)
 
-    def summarize_pdf_bytes(self, pdf_bytes: bytes, file_name: str) -> str:
+    def summarize_pdf_bytes(self, pdf_bytes: bytes, file_name: str, deadline: Optional[Deadline] = None) -> str:
         b64 = base64.b64encode(pdf_bytes).decode("ascii")
         contents = {
             "role": "user",
@@ -94,4 +356,4 @@ class GeminiClient:
                 },
             ],
         }
-        return self._generate(contents)
+        return self._generate(contents, deadline=deadline)
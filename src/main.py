@@ -1,28 +1,26 @@
 from __future__ import annotations
 
+import argparse
 import sys
 from datetime import datetime
-from typing import List, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from .auth import get_drive_service
-from .config import get_defaults
-from .drive_client import (
-    MIME_GOOGLE_DOC,
-    MIME_GOOGLE_SLIDES,
-    MIME_PDF,
-    MIME_PPTX,
-    MIME_PPT,
-    collect_files_recursively,
-    download_pdf,
-    export_google_doc_as_text,
-    export_google_slides_as_text,
-    export_google_slides_as_pdf,
-    extract_pptx_text,
-    get_folder_name,
-    list_subfolders,
-)
+from .cache import FileCache
+from .config import get_defaults, get_gemini_config
+from .deadline import Deadline
+from .extractors import Unsupported
 from .gemini_client import GeminiClient
+from .planner import GeminiTokenCounter, LocalTokenCounter, format_plan, plan_files
+from .pipeline import summarize_uncached
+from .prefetch import FolderPrefetcher
+from .profiling import RunProfiler
+from .scheduler import run_scheduled
+from .search_index import format_results, open_search_index
+from .store import open_store
 from .summarizer import merge_file_summaries
+from .tree_merge import folder_path, merge_tree
 from .utils import extract_folder_id, ensure_dir, print_progress, slugify
 
 
@@ -33,21 +31,27 @@ def _input(prompt: str) -> str:
         return ""
 
 
-def interactive_folder_navigation(service, root_folder_id: str) -> str:
+def interactive_folder_navigation(
+    service, root_folder_id: str, prefetcher: Optional[FolderPrefetcher] = None
+) -> str:
     """
     Let the user navigate through folders starting from root_folder_id.
     Simple downward-only navigation; user chooses 'here' to select current folder.
+    While the prompt is open, the prefetcher loads the next possible listings.
     Return the selected folder ID.
     """
+    prefetcher = prefetcher or FolderPrefetcher()
     current_id = root_folder_id
     while True:
         try:
-            current_name = get_folder_name(service, current_id)
+            current_name = prefetcher.folder_name(service, current_id)
         except Exception:
             current_name = current_id
         print_progress(f"In folder: {current_name}")
 
-        subs = list_subfolders(service, current_id)
+        subs = prefetcher.subfolders(service, current_id)
+        prefetcher.prefetch_subfolders(f["id"] for f in subs)
+        prefetcher.prefetch_files(current_id)
         if not subs:
             print_progress("No subfolders. Type 'here' to summarize this folder, or 'exit' to quit.")
         else:
@@ -72,11 +76,180 @@ def interactive_folder_navigation(service, root_folder_id: str) -> str:
         print_progress("Invalid choice. Please try again.")
 
 
-def main() -> int:
+def _summarize_file(
+    gemini: GeminiClient, cache: FileCache, f: Dict, idx: int, total: int, deadline: Deadline
+) -> Optional[Tuple[str, str]]:
+    """
+    Summarize a single Drive file. Runs on a scheduler worker thread, so it uses
+    the thread's own Drive service. Return (name, summary) or None if skipped.
+    """
+    name = f.get("name", f.get("id", "file"))
+    fid = f.get("id")
+    print_progress(f"[{idx}/{total}] {name}")
+    if not fid:
+        return None
+    with cache.claim_summary(f, gemini.model, deadline=deadline) as cached:
+        if cached is not None:
+            print_progress(f"  Using cached summary for {name}")
+            return name, cached
+        return _summarize_uncached(gemini, cache, f, name, deadline)
+
+
+def _summarize_uncached(
+    gemini: GeminiClient, cache: FileCache, f: Dict, name: str, deadline: Deadline
+) -> Optional[Tuple[str, str]]:
+    try:
+        summary, stats = summarize_uncached(gemini, cache, f, deadline)
+    except Unsupported as e:
+        print_progress(f"  Skipping {name}: {e}")
+        return None
+    except Exception as e:
+        print_progress(f"  Error in {name}: {e}")
+        return None
+    if summary is None:
+        return None
+    if stats.get("tokens_saved"):
+        print_progress(f"  Preprocessing {name}: removed {stats['lines_removed']} lines, saved ~{stats['tokens_saved']} tokens")
+    return name, summary
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m src.main", description="Summarize a Drive study folder with Gemini.")
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Estimate requests, tokens and time for the selected folder without calling Gemini.",
+    )
+    parser.add_argument(
+        "--count-tokens",
+        action="store_true",
+        help="With --plan, count cached text with the Gemini countTokens endpoint instead of a local estimate.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write cProfile, flamegraph (collapsed stacks) and tracemalloc reports next to summary.md.",
+    )
+    parser.add_argument(
+        "--rollup",
+        action="store_true",
+        help="Merge folder by folder along the Drive hierarchy (cached), e.g. for a whole-semester summary.",
+    )
+    commands = parser.add_subparsers(dest="command")
+    search = commands.add_parser("search", help="Search previously generated summaries.")
+    search.add_argument("query", nargs="+", help="Words to look for, e.g. dijkstra shortest path")
+    search.add_argument("--limit", type=int, default=10, help="Maximum number of results (default 10)")
+    return parser.parse_args(argv)
+
+
+def _search(output_dir: Path, cache_dir: Path, query: str, limit: int) -> int:
+    index = open_search_index(cache_dir)
+    # Pick up summaries written before the index existed or by other tools
+    index.sync(output_dir)
+    print(format_results(index.search(query, limit=limit), output_dir))
+    return 0
+
+
+def _index_summary(
+    cache_dir: Path,
+    output_dir: Path,
+    out_path: Path,
+    subject: str,
+    merged: str,
+    summaries: List[Tuple[str, str]],
+) -> None:
+    try:
+        open_search_index(cache_dir).index_summary(
+            out_path.relative_to(output_dir).as_posix(),
+            subject,
+            merged,
+            summaries,
+            mtime=out_path.stat().st_mtime,
+        )
+    except Exception as e:
+        print_progress(f"Could not update search index: {e}")
+
+
+def _collect_and_summarize(
+    args: argparse.Namespace,
+    defaults: Dict,
+    service,
+    prefetcher: FolderPrefetcher,
+    target_folder_id: str,
+    subject_name: str,
+    semester: str,
+) -> Tuple[int, Optional[Path]]:
+    """
+    Summarize the selected folder and write the merged notes.
+    Return (exit code, run directory or None if nothing was written).
+    """
+    output_dir = defaults["output_dir"]
+    # Collect and summarize
+    print_progress("Collecting files recursively...")
+    try:
+        files = prefetcher.files(service, target_folder_id)
+    except Exception as e:
+        print_progress(f"Failed to list files: {e}")
+        return 1, None
+    if not files:
+        print_progress("No supported files found in the selected folder.")
+        return 0, None
+
+    print_progress(f"Found {len(files)} files. Summarizing with Gemini...")
+    gemini = GeminiClient()
+    store = open_store(defaults["cache_dir"])
+    cache = FileCache(store)
+    # Ctrl+C cancels this, aborting in-flight downloads and Gemini calls;
+    # summaries finished so far stay cached for the next run
+    deadline = Deadline()
+    results = run_scheduled(
+        files,
+        lambda idx, f: _summarize_file(gemini, cache, f, idx + 1, len(files), deadline),
+        max_workers=defaults["concurrency"],
+        deadline=deadline,
+    )
+    summaries: List[Tuple[str, str]] = [r for r in results if r is not None]
+
+    if not summaries:
+        print_progress("No summaries produced.")
+        return 0, None
+
+    folder_name = prefetcher.folder_name(service, target_folder_id)
+    if args.rollup:
+        items = [
+            (folder_path(f), r[0], r[1])
+            for f, r in zip(files, results)
+            if r is not None
+        ]
+        merged, stats = merge_tree(subject_name, folder_name, items, store=store, semester=semester or None)
+        print_progress(f"Rollup: {stats['recomputed']} folder merges recomputed, {stats['reused']} reused from cache")
+    else:
+        merged = merge_file_summaries(subject_name, summaries, semester=semester or None)
+    subject_slug = slugify(subject_name)
+    folder_slug = slugify(folder_name)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Build per-subject[/semester]/folder/timestamp directory
+    run_dir = output_dir / subject_slug
+    if semester:
+        run_dir = run_dir / slugify(semester)
+    run_dir = run_dir / folder_slug / ts
+    ensure_dir(run_dir)
+    out_path = run_dir / "summary.md"
+    out_path.write_text(merged, encoding="utf-8")
+    _index_summary(defaults["cache_dir"], output_dir, out_path, subject_name, merged, summaries)
+    print_progress(f"Done. Summary saved to: {out_path}")
+    return 0, run_dir
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
     defaults = get_defaults()
     output_dir = defaults["output_dir"]
     ensure_dir(output_dir)
 
+    if args.command == "search":
+        return _search(output_dir, defaults["cache_dir"], " ".join(args.query), args.limit)
+
     print_progress("Authorizing with Google Drive...")
     service = get_drive_service()
 
@@ -98,87 +271,50 @@ def main() -> int:
         except Exception as e:
             print_progress(f"Could not parse: {e}")
 
+    if args.plan:
+        with FolderPrefetcher() as prefetcher:
+            target_folder_id = interactive_folder_navigation(service, root_folder_id, prefetcher)
+            print_progress("Collecting files recursively...")
+            files = prefetcher.files(service, target_folder_id)
+        gemini_cfg = get_gemini_config()
+        counter = GeminiTokenCounter() if args.count_tokens else LocalTokenCounter()
+        plan = plan_files(
+            files,
+            FileCache(open_store(defaults["cache_dir"])),
+            model=gemini_cfg["model"],
+            counter=counter,
+            concurrency=defaults["concurrency"],
+            rpm=gemini_cfg["rpm"],
+        )
+        print(format_plan(plan))
+        return 0
+
     # Subject and semester inputs
     subject_name = _input("Enter Subject Name: ").strip()
     while not subject_name:
         subject_name = _input("Subject Name is required. Enter Subject Name: ").strip()
     semester = _input("Enter Semester (e.g., Sem 3) [optional]: ").strip()
 
-    # Navigate to target folder
-    target_folder_id = interactive_folder_navigation(service, root_folder_id)
+    # Navigate to target folder; leaving the block stops leftover prefetches
+    with FolderPrefetcher() as prefetcher:
+        target_folder_id = interactive_folder_navigation(service, root_folder_id, prefetcher)
 
-    # Collect and summarize
-    print_progress("Collecting files recursively...")
-    try:
-        files = collect_files_recursively(service, target_folder_id)
-    except Exception as e:
-        print_progress(f"Failed to list files: {e}")
-        return 1
-    if not files:
-        print_progress("No supported files found in the selected folder.")
-        return 0
-
-    print_progress(f"Found {len(files)} files. Summarizing with Gemini...")
-    gemini = GeminiClient()
-    summaries: List[Tuple[str, str]] = []
-    for idx, f in enumerate(files, start=1):
-        name = f.get("name", f.get("id", "file"))
-        mime = f.get("mimeType", "")
-        fid = f.get("id")
-        print_progress(f"[{idx}/{len(files)}] {name}")
-        if not fid:
-            continue
+        profiler = RunProfiler().start() if args.profile else None
+        run_dir: Optional[Path] = None
         try:
-            if mime == MIME_PDF:
-                pdf_bytes = download_pdf(service, fid)
-                summary = gemini.summarize_pdf_bytes(pdf_bytes, name)
-            elif mime == MIME_GOOGLE_DOC:
-                text = export_google_doc_as_text(service, fid)
-                if not text.strip():
-                    continue
-                summary = gemini.summarize_plain_text(text, name)
-            elif mime == MIME_GOOGLE_SLIDES:
-                # Prefer text export for concise summaries; fallback to PDF if needed
-                text = export_google_slides_as_text(service, fid)
-                if text and text.strip():
-                    summary = gemini.summarize_plain_text(text, name)
-                else:
-                    pdf_bytes = export_google_slides_as_pdf(service, fid)
-                    summary = gemini.summarize_pdf_bytes(pdf_bytes, name)
-            elif mime == MIME_PPTX:
-                text = extract_pptx_text(service, fid)
-                if not text.strip():
-                    continue
-                summary = gemini.summarize_plain_text(text, name)
-            elif mime == MIME_PPT:
-                print_progress("  Skipping legacy .ppt file. Please convert to Google Slides or .pptx for best results.")
-                continue
-            else:
-                continue
-            summaries.append((name, summary))
-        except Exception as e:
-            print_progress(f"  Error: {e}")
-            continue
-
-    if not summaries:
-        print_progress("No summaries produced.")
-        return 0
-
-    merged = merge_file_summaries(subject_name, summaries, semester=semester or None)
-    subject_slug = slugify(subject_name)
-    folder_name = get_folder_name(service, target_folder_id)
-    folder_slug = slugify(folder_name)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    # Build per-subject[/semester]/folder/timestamp directory
-    run_dir = output_dir / subject_slug
-    if semester:
-        run_dir = run_dir / slugify(semester)
-    run_dir = run_dir / folder_slug / ts
-    ensure_dir(run_dir)
-    out_path = run_dir / "summary.md"
-    out_path.write_text(merged, encoding="utf-8")
-    print_progress(f"Done. Summary saved to: {out_path}")
-    return 0
+            code, run_dir = _collect_and_summarize(
+                args, defaults, service, prefetcher, target_folder_id, subject_name, semester
+            )
+        finally:
+            if profiler is not None:
+                profiler.stop()
+                profile_dir = run_dir or output_dir / "profiles" / datetime.now().strftime("%Y%m%d_%H%M%S")
+                profiler.write(profile_dir)
+                print_progress(
+                    f"Profile written to {profile_dir} (profile.pstats, profile.collapsed.txt, memory.txt); "
+                    f"peak memory {profiler.peak_bytes / (1024 * 1024):.1f} MiB"
+                )
+    return code
 
 
 if __name__ == "__main__":
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+from .auth import get_thread_drive_service
+from .cache import FileCache
+from .deadline import Deadline
+from .extractors import extract
+from .gemini_client import GeminiClient
+from .preprocess import clean_extracted_text
+
+
+def summarize_uncached(
+    gemini: GeminiClient,
+    cache: FileCache,
+    file: Dict,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[Optional[str], Dict[str, int]]:
+    """
+    Extract, clean and summarize one file on a scheduler worker thread (with
+    the thread's own Drive service), and cache the summary. Shared by the CLI
+    and the API so both handle every registered file type the same way.
+    Return (summary or None if the file has no content, preprocessing stats).
+    Raises extractors.Unsupported for types without an extractor.
+    """
+    name = file.get("name", file.get("id", "file"))
+    content = extract(get_thread_drive_service(), file, cache, deadline)
+    if content.empty:
+        return None, {}
+    stats: Dict[str, int] = {}
+    if content.pdf:
+        summary = gemini.summarize_pdf_bytes(content.pdf, name, deadline=deadline)
+    else:
+        text, stats = clean_extracted_text(content.text or "", paged=content.paged)
+        summary = gemini.summarize_plain_text(text, name, deadline=deadline)
+    cache.put_summary(file, gemini.model, summary)
+    return summary, stats
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import heapq
+import logging
+from typing import Dict, List, Optional
+
+from .cache import FileCache
+from .drive_client import MIME_PPT
+from .extractors import is_paged
+from .gemini_client import PROMPT_TEMPLATE, GeminiClient
+from .preprocess import clean_extracted_text
+from .scheduler import estimate_tokens, schedule_order
+
+# Rough Gemini performance figures used to turn tokens into wall time
+OUTPUT_TOKENS_PER_REQUEST = 1200
+REQUEST_OVERHEAD_S = 2.0
+INPUT_TOKENS_PER_S = 8000.0
+OUTPUT_TOKENS_PER_S = 150.0
+# Drive download throughput for binary files (bytes/s)
+DOWNLOAD_BYTES_PER_S = 10 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class LocalTokenCounter:
+    """
+    Offline token estimate (~4 characters per token). Used by default so
+    planning needs no network, and as a stand-in for countTokens in tests.
+    """
+
+    def count_text_tokens(self, text: str, file_name: str) -> int:
+        prompt = PROMPT_TEMPLATE.format(file_name=file_name)
+        return (len(prompt) + len(text)) // 4 + 1
+
+
+class GeminiTokenCounter:
+    """
+    Exact counts from the Gemini countTokens endpoint.
+    """
+
+    def __init__(self, gemini: Optional[GeminiClient] = None):
+        self.gemini = gemini or GeminiClient()
+
+    def count_text_tokens(self, text: str, file_name: str) -> int:
+        return self.gemini.count_text_tokens(text, file_name)
+
+
+def _estimate_seconds(input_tokens: int, size: int) -> float:
+    return (
+        REQUEST_OVERHEAD_S
+        + size / DOWNLOAD_BYTES_PER_S
+        + input_tokens / INPUT_TOKENS_PER_S
+        + OUTPUT_TOKENS_PER_REQUEST / OUTPUT_TOKENS_PER_S
+    )
+
+
+def _simulate_makespan(durations: List[float], concurrency: int, rpm: int) -> float:
+    """
+    Simulate the scheduler: jobs start largest-first on `concurrency` workers,
+    and request starts are spaced by the per-minute rate limit.
+    """
+    if not durations:
+        return 0.0
+    min_gap = 60.0 / rpm if rpm > 0 else 0.0
+    workers = [0.0] * max(1, concurrency)
+    next_start = 0.0
+    end = 0.0
+    for d in durations:
+        free_at = heapq.heappop(workers)
+        start = max(free_at, next_start)
+        next_start = start + min_gap
+        finish = start + d
+        end = max(end, finish)
+        heapq.heappush(workers, finish)
+    return end
+
+
+def plan_files(
+    files: List[Dict],
+    cache: FileCache,
+    model: str,
+    counter: Optional[object] = None,
+    concurrency: int = 4,
+    rpm: int = 15,
+) -> Dict:
+    """
+    Estimate the cost of summarizing files without calling generateContent.
+    Token counts come from cached extracted text when available (counted with
+    `counter`), otherwise from Drive metadata. If the counter fails (e.g.
+    countTokens is unreachable), the rest of the plan uses the local estimate
+    and the plan's "warnings" say so.
+    """
+    counter = counter or LocalTokenCounter()
+    local = LocalTokenCounter()
+    warnings: List[str] = []
+    entries: List[Dict] = []
+    durations: Dict[int, float] = {}
+    for idx, f in enumerate(files):
+        name = f.get("name", f.get("id", "file"))
+        entry = {"name": name, "mimeType": f.get("mimeType", ""), "cached": False}
+        if f.get("mimeType") == MIME_PPT or not f.get("id"):
+            entry.update({"status": "skipped", "inputTokens": 0})
+        elif cache.get_summary(f, model) is not None:
+            entry.update({"status": "cache-hit", "inputTokens": 0, "cached": True})
+        else:
+            text = cache.get_text(f)
+            if text is not None:
+                # Count what would actually be sent, after boilerplate stripping
+                cleaned = clean_extracted_text(text, paged=is_paged(f.get("mimeType", "")))[0]
+                source = "cached-text"
+                try:
+                    tokens = counter.count_text_tokens(cleaned, name)  # type: ignore[attr-defined]
+                except Exception as e:
+                    if counter is local:
+                        raise
+                    warning = f"Token counting failed ({e}); using the local estimate instead"
+                    logger.warning(warning)
+                    warnings.append(warning)
+                    counter = local
+                    tokens = local.count_text_tokens(cleaned, name)
+            else:
+                tokens = estimate_tokens(f) + len(PROMPT_TEMPLATE) // 4
+                source = "metadata"
+            entry.update({"status": "request", "inputTokens": tokens, "source": source})
+            durations[idx] = _estimate_seconds(tokens, int(f.get("size") or 0))
+        entries.append(entry)
+
+    ordered = [durations[i] for i in schedule_order(files) if i in durations]
+    requests = len(durations)
+    input_tokens = sum(e["inputTokens"] for e in entries)
+    return {
+        "files": len(files),
+        "requests": requests,
+        "cacheHits": sum(1 for e in entries if e["status"] == "cache-hit"),
+        "skipped": sum(1 for e in entries if e["status"] == "skipped"),
+        "inputTokens": input_tokens,
+        "outputTokens": requests * OUTPUT_TOKENS_PER_REQUEST,
+        "concurrency": concurrency,
+        "rpm": rpm,
+        "estimatedSeconds": round(_simulate_makespan(ordered, concurrency, rpm), 1),
+        "perFile": entries,
+        "warnings": warnings,
+    }
+
+
+def format_plan(plan: Dict) -> str:
+    lines = [
+        f"Files: {plan['files']} ({plan['cacheHits']} cached, {plan['skipped']} skipped)",
+        f"Gemini requests: {plan['requests']}",
+        f"Estimated tokens: {plan['inputTokens']:,} in / {plan['outputTokens']:,} out",
+        (
+            f"Estimated wall time: {plan['estimatedSeconds'] / 60:.1f} min "
+            f"(concurrency {plan['concurrency']}, {plan['rpm']} req/min)"
+        ),
+    ]
+    lines.extend(f"Warning: {w}" for w in plan.get("warnings", []))
+    for e in plan["perFile"]:
+        detail = e["status"]
+        if e["status"] == "request":
+            detail = f"~{e['inputTokens']:,} tokens ({e['source']})"
+        lines.append(f"  - {e['name']}: {detail}")
+    return "\n".join(lines)
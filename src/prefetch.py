@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .auth import get_thread_drive_service
+from .deadline import Deadline
+from .drive_client import get_folder_name, list_subfolders
+from .extractors import list_supported_files
+
+NAVIGATED_AWAY = "navigated away"
+
+
+class FolderPrefetcher:
+    """
+    Speculatively loads Drive listings in the background while the user is
+    looking at the navigation prompt:
+    - the subfolder listing of every displayed subfolder (next possible step),
+    - folder names learned from parent listings (no get_folder_name call),
+    - a recursive file listing of the current folder (in case they type 'here').
+    Tasks run on a bounded pool whose threads each build and reuse their own
+    Drive service. Recursive walks carry a Deadline: navigating elsewhere
+    cancels them, and close() (or leaving the `with` block) stops them all.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="study-agent-prefetch")
+        self._lock = threading.Lock()
+        self._names: Dict[str, str] = {}
+        self._subfolders: Dict[str, Future] = {}
+        self._files: Dict[str, Tuple[Future, Deadline]] = {}
+
+    def __enter__(self) -> "FolderPrefetcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Cancel queued and running prefetches; cached results stay usable."""
+        with self._lock:
+            walks = list(self._files.values())
+        for _, deadline in walks:
+            deadline.cancel(NAVIGATED_AWAY)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn: Callable, *args, **kwargs) -> Future:
+        # googleapiclient services are not thread-safe: each pool thread uses its own
+        return self._pool.submit(lambda: fn(get_thread_drive_service(), *args, **kwargs))
+
+    def remember_names(self, folders: Iterable[Dict]) -> None:
+        with self._lock:
+            for f in folders:
+                self._names[f["id"]] = f.get("name", f["id"])
+
+    def folder_name(self, service, folder_id: str) -> str:
+        with self._lock:
+            name = self._names.get(folder_id)
+        if name is not None:
+            return name
+        name = get_folder_name(service, folder_id)
+        self.remember_names([{"id": folder_id, "name": name}])
+        return name
+
+    def prefetch_subfolders(self, folder_ids: Iterable[str]) -> None:
+        with self._lock:
+            for fid in folder_ids:
+                if fid not in self._subfolders:
+                    try:
+                        self._subfolders[fid] = self._submit(list_subfolders, fid)
+                    except RuntimeError:
+                        # Closed: listings are fetched on demand from now on
+                        return
+
+    def subfolders(self, service, folder_id: str) -> List[Dict]:
+        with self._lock:
+            fut = self._subfolders.get(folder_id)
+        subs = None
+        # A listing still queued behind other prefetches is cancelled and
+        # fetched directly instead of waiting for a free worker
+        if fut is not None and not fut.cancel():
+            try:
+                subs = fut.result()
+            except Exception:
+                subs = None
+        if subs is None:
+            subs = list_subfolders(service, folder_id)
+            done: Future = Future()
+            done.set_result(subs)
+            with self._lock:
+                self._subfolders[folder_id] = done
+        self.remember_names(subs)
+        return subs
+
+    def prefetch_files(self, folder_id: str) -> None:
+        """
+        Start the recursive file listing for folder_id and stop listings for
+        folders the user has navigated away from, queued or already running.
+        """
+        with self._lock:
+            for fid, (fut, deadline) in list(self._files.items()):
+                if fid != folder_id:
+                    fut.cancel()
+                    deadline.cancel(NAVIGATED_AWAY)
+                    del self._files[fid]
+            if folder_id not in self._files:
+                deadline = Deadline()
+                try:
+                    fut = self._submit(list_supported_files, folder_id, deadline=deadline)
+                except RuntimeError:
+                    return
+                self._files[folder_id] = (fut, deadline)
+
+    def files(self, service, folder_id: str, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """
+        Return the recursive file listing, reusing the speculative one if it
+        has started; one still queued is cancelled and listed directly.
+        """
+        with self._lock:
+            entry = self._files.get(folder_id)
+        if entry is not None:
+            fut, walk_deadline = entry
+            if not fut.cancel() and not walk_deadline.cancelled:
+                try:
+                    return fut.result()
+                except Exception:
+                    pass
+        return list_supported_files(service, folder_id, deadline=deadline)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Lines that are only a page/slide number, e.g. "12", "Page 3", "3 / 40", "Slide 7 of 20"
+_PAGE_NUMBER_RE = re.compile(r"^(?:page|slide|pg\.?)?\s*\d{1,4}(?:\s*(?:/|of)\s*\d{1,4})?$", re.IGNORECASE)
+# Page references inside a footer ("Data Structures 101 | Page 3", "CS201 · 3 / 40"),
+# ignored when spotting lines repeated across pages
+_PAGE_REF_RE = re.compile(
+    r"\b(?:page|slide|pg\.?)\s*\d{1,4}(?:\s*(?:/|of)\s*\d{1,4})?|\b\d{1,4}\s*(?:/|of)\s*\d{1,4}\s*$",
+    re.IGNORECASE,
+)
+_WS_RE = re.compile(r"[ \t\u00a0]+")
+# Code and formula lines ("}", "return 0;", "x = y + 1") are never treated as
+# boilerplate or duplicates: repeating them is usually meaningful. A line is
+# code if it ends in ; { or }, starts with } or a keyword, or is "lhs = rhs"
+_CODE_RE = re.compile(
+    r"[;{}]$|^}|^(?:return|if|else|elif|for|while|do|break|continue|def|class|end)\b|\S\s*[-+*/%<>!=]?=\s*\S",
+    re.IGNORECASE,
+)
+
+# A line is boilerplate if it is short and shows up on this share of pages
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_PAGE_SHARE = 0.3
+BOILERPLATE_MAX_CHARS = 80
+# Exact duplicates are only dropped for lines with at least this many words,
+# so short code lines or labels like "Example:" survive
+DUPLICATE_MIN_WORDS = 3
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Rough Gemini token count (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def _normalize(line: str) -> str:
+    return _WS_RE.sub(" ", line).strip()
+
+
+def _looks_like_code(line: str) -> bool:
+    return bool(_CODE_RE.search(line))
+
+
+def _boilerplate_key(line: str) -> str:
+    return _normalize(_PAGE_REF_RE.sub("#", line)).lower()
+
+
+def _split_pages(text: str) -> List[List[str]]:
+    """
+    Split into pages on form feeds (PPTX text); without them, fall back to
+    blank-line separated blocks, which is how Slides text exports separate
+    slides.
+    """
+    if "\f" in text:
+        chunks = text.split("\f")
+    else:
+        chunks = re.split(r"\n\s*\n", text)
+    return [[_normalize(line) for line in chunk.splitlines()] for chunk in chunks]
+
+
+def _boilerplate_lines(pages: List[List[str]]) -> set:
+    if len(pages) < BOILERPLATE_MIN_PAGES:
+        return set()
+    per_page = Counter()
+    for page in pages:
+        per_page.update({
+            _boilerplate_key(line) for line in page if line and len(line) <= BOILERPLATE_MAX_CHARS
+        })
+    cutoff = max(BOILERPLATE_MIN_PAGES, BOILERPLATE_PAGE_SHARE * len(pages))
+    return {line for line, n in per_page.items() if n >= cutoff}
+
+
+def clean_extracted_text(text: str, paged: bool = False) -> Tuple[str, Dict[str, int]]:
+    """
+    Strip repeated footers/banners, page numbers, duplicate lines and extra
+    whitespace from exported slide/document text before it is sent to Gemini.
+    Footers and page numbers are only stripped when paged is set (slide text,
+    split on form feeds or blank lines); in unpaged text such as Docs exports
+    a "42" or a repeated heading may be content. Code and formula lines are
+    always kept.
+    Return (cleaned_text, stats) where stats reports the estimated tokens saved.
+    """
+    pages = _split_pages(text)
+    boilerplate = _boilerplate_lines(pages) if paged else set()
+    seen = set()
+    out: List[str] = []
+    removed = 0
+    for page in pages:
+        for line in page:
+            if not line:
+                continue
+            if paged and _PAGE_NUMBER_RE.match(line):
+                removed += 1
+                continue
+            if _looks_like_code(line):
+                out.append(line)
+                continue
+            if _boilerplate_key(line) in boilerplate:
+                removed += 1
+                continue
+            key = line.lower()
+            if len(line.split()) >= DUPLICATE_MIN_WORDS:
+                if key in seen:
+                    removed += 1
+                    continue
+                seen.add(key)
+            out.append(line)
+        # Keep one blank line between pages so slide boundaries stay visible
+        if out and out[-1] != "":
+            out.append("")
+    cleaned = "\n".join(out).strip()
+    before = estimate_text_tokens(text)
+    after = estimate_text_tokens(cleaned)
+    return cleaned, {
+        "lines_removed": removed,
+        "tokens_before": before,
+        "tokens_after": after,
+        "tokens_saved": max(0, before - after),
+    }
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+from .utils import ensure_dir
+
+# Only one profiler can own the interpreter-wide hooks at a time
+_active_lock = threading.Lock()
+
+
+class RunProfiler:
+    """
+    Profiles one run across all threads:
+    - a single cProfile for the process, written as .pstats (snakeviz,
+      pstats). On Python 3.12+ it sees every thread, since cProfile hooks
+      into sys.monitoring, which is process-wide; before 3.12 it sees only the
+      thread that called start(),
+    - a wall-clock stack sampler over all threads (scheduler and hedge workers
+      included) written as collapsed stacks, the input format of flamegraph.pl
+      and speedscope,
+    - tracemalloc peak memory and top allocation sites.
+    Only one cProfile can be active per process on 3.12+, so no per-thread
+    profilers are started and stop() leaves no hooks behind in other threads.
+    """
+
+    def __init__(self, sample_interval: float = 0.005, traceback_frames: int = 16):
+        self.sample_interval = sample_interval
+        self.traceback_frames = traceback_frames
+        self._profile: Optional[cProfile.Profile] = None
+        self._samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started_tracemalloc = False
+        self.peak_bytes = 0
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak_snapshot: Optional[tracemalloc.Snapshot] = None
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def _maybe_snapshot_peak(self, state: Dict[str, float]) -> None:
+        # Snapshot allocations near the memory peak (rate-limited: snapshots are
+        # not free), since the end-of-run snapshot only shows what survived
+        current, _ = tracemalloc.get_traced_memory()
+        now = time.perf_counter()
+        if current > state["best"] * 1.1 and now - state["last"] >= 0.5:
+            self._peak_snapshot = tracemalloc.take_snapshot()
+            state["best"] = current
+            state["last"] = now
+
+    def _sample_loop(self) -> None:
+        me = threading.get_ident()
+        names = {}
+        peak_state = {"best": 0.0, "last": 0.0}
+        while not self._stop.wait(self.sample_interval):
+            self._maybe_snapshot_peak(peak_state)
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self._samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> "RunProfiler":
+        """
+        Start profiling. Raises RuntimeError if another run is already being
+        profiled, or another profiler (e.g. python -m cProfile) is active.
+        """
+        if not _active_lock.acquire(blocking=False):
+            raise RuntimeError("Another run is already being profiled")
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # 3.12+: "Another profiling tool is already active"
+            _active_lock.release()
+            raise RuntimeError(f"Cannot profile this run: {e}") from e
+        self._profile = profile
+        self.started = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._sampler = threading.Thread(target=self._sample_loop, name="study-agent-sampler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._snapshot = tracemalloc.take_snapshot()
+        _, self.peak_bytes = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        self.elapsed = time.perf_counter() - self.started
+        _active_lock.release()
+
+    def _stats(self) -> Optional[pstats.Stats]:
+        if self._profile is None:
+            return None
+        try:
+            return pstats.Stats(self._profile)
+        except TypeError:
+            # Nothing was profiled
+            return None
+
+    def write(self, out_dir: Path) -> Dict[str, Path]:
+        """Write profile.pstats, profile.txt, profile.collapsed.txt and memory.txt."""
+        ensure_dir(out_dir)
+        paths: Dict[str, Path] = {}
+
+        stats = self._stats()
+        if stats is not None:
+            paths["pstats"] = out_dir / "profile.pstats"
+            stats.dump_stats(str(paths["pstats"]))
+            buf = io.StringIO()
+            stats.stream = buf  # type: ignore[attr-defined]
+            stats.sort_stats("cumulative").print_stats(40)
+            paths["text"] = out_dir / "profile.txt"
+            paths["text"].write_text(buf.getvalue(), encoding="utf-8")
+
+        paths["collapsed"] = out_dir / "profile.collapsed.txt"
+        paths["collapsed"].write_text(
+            "\n".join(f"{stack} {count}" for stack, count in self._samples.most_common()),
+            encoding="utf-8",
+        )
+
+        lines = [
+            f"Wall time: {self.elapsed:.2f} s",
+            f"Peak traced memory: {self.peak_bytes / (1024 * 1024):.1f} MiB",
+            "",
+        ]
+        for title, snap in (("near peak", self._peak_snapshot), ("at end of run", self._snapshot)):
+            if snap is None:
+                continue
+            snap = snap.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ])
+            lines.append(f"Top allocations by line ({title}):")
+            lines.extend(f"  {stat}" for stat in snap.statistics("lineno")[:25])
+            lines.append(f"Top allocation tracebacks ({title}):")
+            for stat in snap.statistics("traceback")[:5]:
+                lines.append(f"  {stat.size / 1024:.1f} KiB in {stat.count} blocks")
+                lines.extend(f"    {line}" for line in stat.traceback.format())
+            lines.append("")
+        paths["memory"] = out_dir / "memory.txt"
+        paths["memory"].write_text("\n".join(lines), encoding="utf-8")
+        return paths
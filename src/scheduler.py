@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from .deadline import Deadline
+from .drive_client import (
+    MIME_GOOGLE_DOC,
+    MIME_GOOGLE_SLIDES,
+    MIME_PDF,
+    MIME_PPT,
+    MIME_PPTX,
+)
+
+R = TypeVar("R")
+
+# Approximate Gemini input tokens per byte of the Drive file. PDFs are sent
+# inline (~258 tokens per page, ~60 KB per page); PPTX files are mostly images,
+# so only a small share of their bytes survives text extraction.
+TOKENS_PER_BYTE: Dict[str, float] = {
+    MIME_PDF: 0.0043,
+    MIME_PPTX: 0.0005,
+}
+
+# Fallback estimates for files without a size (Google-native files, shortcuts)
+DEFAULT_TOKENS: Dict[str, int] = {
+    MIME_PDF: 20000,
+    MIME_GOOGLE_DOC: 6000,
+    MIME_GOOGLE_SLIDES: 4000,
+    MIME_PPTX: 4000,
+    MIME_PPT: 0,
+}
+
+
+def estimate_tokens(file: Dict) -> int:
+    """
+    Estimate the Gemini input tokens for a file from its Drive metadata only.
+    """
+    mime = file.get("mimeType", "")
+    size = int(file.get("size") or 0)
+    per_byte = TOKENS_PER_BYTE.get(mime)
+    if size and per_byte:
+        return max(1, int(size * per_byte))
+    return DEFAULT_TOKENS.get(mime, 0)
+
+
+def schedule_order(files: List[Dict]) -> List[int]:
+    """
+    Return indices of files ordered largest-first (longest processing time first).
+    Ties keep their listing order so runs are reproducible.
+    """
+    return sorted(range(len(files)), key=lambda i: (-estimate_tokens(files[i]), i))
+
+
+def run_scheduled(
+    files: List[Dict],
+    work: Callable[[int, Dict], R],
+    max_workers: int = 4,
+    deadline: Optional[Deadline] = None,
+) -> List[Optional[R]]:
+    """
+    Run work(index, file) for every file on a thread pool, submitting the most
+    expensive files first so a large PDF never starts last and becomes the
+    straggler. Results are returned in the original listing order.
+
+    When the deadline is cancelled (or the caller is interrupted, e.g. Ctrl+C),
+    files not yet started are dropped and Cancelled is raised once the running
+    ones have stopped; work should pass the deadline on to abort its own calls.
+    """
+    deadline = deadline or Deadline()
+    results: List[Optional[R]] = [None] * len(files)
+    if not files:
+        return results
+    order = schedule_order(files)
+    workers = max(1, min(max_workers, len(files)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="study-agent") as pool:
+        futures = {i: pool.submit(work, i, files[i]) for i in order}
+
+        def _drop_pending() -> None:
+            for fut in futures.values():
+                fut.cancel()
+
+        with deadline.on_cancel(_drop_pending):
+            try:
+                for i, fut in futures.items():
+                    try:
+                        results[i] = fut.result()
+                    except CancelledError:
+                        pass
+            except BaseException:
+                deadline.cancel("interrupted")
+                raise
+    deadline.check()
+    return results
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .utils import ensure_dir
+
+DB_NAME = "search.db"
+MERGED_SOURCE = "(merged)"
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+    path UNINDEXED,
+    source UNINDEXED,
+    subject,
+    section,
+    body,
+    tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+"""
+
+_HEADING_RE = re.compile(r"^(#{1,3})\s+(.+?)\s*$", re.MULTILINE)
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def split_sections(markdown: str) -> List[Tuple[str, str]]:
+    """
+    Split Markdown into (heading, body) pairs on #, ## and ### headings.
+    Text before the first heading is returned under an empty heading.
+    """
+    sections: List[Tuple[str, str]] = []
+    matches = list(_HEADING_RE.finditer(markdown))
+    if not matches or matches[0].start() > 0:
+        head = markdown[: matches[0].start() if matches else len(markdown)].strip()
+        if head:
+            sections.append(("", head))
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(markdown)
+        body = markdown[m.end():end].strip()
+        if body:
+            sections.append((m.group(2), body))
+    return sections
+
+
+def _fts_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word must match, and a last
+    word of 3+ characters also matches as a prefix so partial input still
+    finds results. Possessives ("Dijkstra's") are reduced to the base word.
+    """
+    words = _WORD_RE.findall(re.sub(r"['’]s\b", "", query))
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words]
+    if len(words[-1]) >= 3:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index over generated summaries. Each merged summary and each
+    per-file section is one row, so hits point at a file and section.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        ensure_dir(self.db_path.parent)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def index_summary(
+        self,
+        path: str,
+        subject: str,
+        merged: str,
+        file_summaries: Sequence[Tuple[str, str]] = (),
+        mtime: float = 0.0,
+    ) -> None:
+        """
+        (Re)index one summary file. `path` is relative to the output directory.
+        Previous rows for the same path are replaced.
+        """
+        rows = [(path, MERGED_SOURCE, subject, heading, body) for heading, body in split_sections(merged)]
+        for name, summary in file_summaries:
+            rows.extend((path, name, subject, heading, body) for heading, body in split_sections(summary))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM sections WHERE path = ?", (path,))
+            conn.executemany(
+                "INSERT INTO sections (path, source, subject, section, body) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("INSERT OR REPLACE INTO documents (path, mtime) VALUES (?, ?)", (path, mtime))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def remove(self, paths: Sequence[str]) -> None:
+        """Drop every row for the given summary paths."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM sections WHERE path = ?", [(p,) for p in paths])
+            conn.executemany("DELETE FROM documents WHERE path = ?", [(p,) for p in paths])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def sync(self, output_dir: Path) -> int:
+        """
+        Bring the index in line with the summaries under output_dir: index files
+        that are new or changed since they were last indexed (e.g. written
+        before the index existed) and drop files that were deleted. Only the
+        merged text is available from disk. Return the number of files
+        (re)indexed or removed.
+        """
+        output_dir = Path(output_dir)
+        known: Dict[str, float] = dict(self._conn().execute("SELECT path, mtime FROM documents"))
+        on_disk = set()
+        count = 0
+        for md in output_dir.rglob("*.md"):
+            rel = md.relative_to(output_dir).as_posix()
+            on_disk.add(rel)
+            mtime = md.stat().st_mtime
+            if rel in known and known[rel] >= mtime:
+                continue
+            text = md.read_text(encoding="utf-8", errors="ignore")
+            title = next((h for h, _ in split_sections(text) if h), "")
+            self.index_summary(rel, title, text, mtime=mtime)
+            count += 1
+        deleted = [path for path in known if path not in on_disk]
+        if deleted:
+            self.remove(deleted)
+        return count + len(deleted)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Return the best matching sections (BM25 ranked) with highlighted snippets.
+        """
+        fts = _fts_query(query)
+        if not fts:
+            return []
+        rows = self._conn().execute(
+            """
+            SELECT path, source, subject, section,
+                   snippet(sections, 4, '**', '**', ' … ', 12),
+                   bm25(sections, 0.0, 0.0, 2.0, 4.0, 1.0) AS score
+            FROM sections
+            WHERE sections MATCH ?
+            ORDER BY score
+            LIMIT ?
+            """,
+            (fts, limit),
+        ).fetchall()
+        return [
+            {
+                "path": r[0],
+                "source": r[1],
+                "subject": r[2],
+                "section": r[3],
+                "snippet": r[4],
+                "score": round(-r[5], 3),
+            }
+            for r in rows
+        ]
+
+
+_indexes: Dict[Path, SearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_search_index(cache_dir: Path) -> SearchIndex:
+    """Return the process-wide SearchIndex stored in cache_dir."""
+    path = Path(cache_dir) / DB_NAME
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = SearchIndex(path)
+        return _indexes[path]
+
+
+def format_results(results: List[Dict], output_dir: Optional[Path] = None) -> str:
+    if not results:
+        return "No matches."
+    lines = []
+    for i, r in enumerate(results, start=1):
+        location = Path(output_dir) / r["path"] if output_dir else r["path"]
+        source = "" if r["source"] == MERGED_SOURCE else f" [{r['source']}]"
+        lines.append(f"{i}. {location}{source} › {r['section'] or '(top)'}")
+        lines.append(f"   {r['snippet']}")
+    return "\n".join(lines)
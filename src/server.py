@@ -1,12 +1,27 @@
 from __future__ import annotations
 
+import argparse
+import os
 import sys
+from typing import List, Optional
 
 import uvicorn
 
+from .config import get_defaults
 
-def main() -> int:
-    uvicorn.run("src.api:app", host="127.0.0.1", port=8000, reload=False)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.server", description="Run the Study Agent API.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=get_defaults()["workers"],
+        help="Number of uvicorn worker processes (state is shared through the SQLite store).",
+    )
+    args = parser.parse_args(argv)
+    # Worker processes size their CPU pools from this (see extractors.cpu_pool)
+    os.environ["STUDY_AGENT_WORKERS"] = str(args.workers)
+    uvicorn.run("src.api:app", host="127.0.0.1", port=8000, reload=False, workers=args.workers)
     return 0
 
 
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .utils import ensure_dir
+
+DB_NAME = "study_agent.db"
+
+# A queued/running job whose lease is not renewed for this long is assumed to
+# belong to a dead worker and is marked failed
+JOB_LEASE_S = 120.0
+STALE_JOB_ERROR = "Worker stopped before the job finished (lease expired)"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    lease_expires REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS file_cache (
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (key, kind)
+);
+CREATE TABLE IF NOT EXISTS locks (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+def owner_id() -> str:
+    """Identify the calling worker process and thread (used as lock/job owner)."""
+    return f"{os.getpid()}:{threading.get_ident()}"
+
+
+class Heartbeat:
+    """
+    Context manager that calls renew() every interval seconds on a daemon
+    thread while the block runs, so a lease held by a live worker does not
+    expire however long the work takes. Stops early once renew() returns
+    False (the lease was lost).
+    """
+
+    def __init__(self, renew: Callable[[], bool], interval: float):
+        self.renew = renew
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Heartbeat":
+        self._thread = threading.Thread(target=self._run, name="study-agent-heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.renew():
+                    return
+            except sqlite3.Error:
+                # Busy or locked database: try again on the next beat
+                continue
+
+    def __enter__(self) -> "Heartbeat":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+class Store:
+    """
+    Shared local SQLite store for job state, the per-file cache and locks.
+    The database runs in WAL mode so several uvicorn worker processes (and the
+    CLI) can read while one writes. Each thread gets its own connection.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        ensure_dir(self.db_path.parent)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "lease_expires" not in columns:
+            # Databases created before job leases existed
+            conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires REAL")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; multi-statement updates use explicit transactions
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # Jobs
+
+    def create_job(self, request: Dict[str, Any], lease: float = JOB_LEASE_S) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, status, request, lease_expires, created, updated) VALUES (?, 'queued', ?, ?, ?, ?)",
+            (job_id, json.dumps(request), now + lease, now, now),
+        )
+        return job_id
+
+    def update_job(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, owner = ?, lease_expires = ?, updated = ? WHERE id = ?",
+            (
+                status,
+                json.dumps(result) if result is not None else None,
+                error,
+                owner_id(),
+                now + JOB_LEASE_S,
+                now,
+                job_id,
+            ),
+        )
+
+    def renew_job(self, job_id: str, lease: float = JOB_LEASE_S) -> bool:
+        """Extend the lease of a queued/running job; False once it has finished or been swept."""
+        cur = self._conn().execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status IN ('queued', 'running')",
+            (time.time() + lease, job_id),
+        )
+        return cur.rowcount == 1
+
+    def sweep_stale_jobs(self, job_id: Optional[str] = None) -> int:
+        """
+        Mark queued/running jobs whose lease expired (their worker died) as
+        failed, all of them or only job_id. Return how many were marked.
+        """
+        now = time.time()
+        sql = (
+            "UPDATE jobs SET status = 'failed', error = ?, updated = ? "
+            "WHERE status IN ('queued', 'running') AND COALESCE(lease_expires, updated + ?) < ?"
+        )
+        params: tuple = (STALE_JOB_ERROR, now, JOB_LEASE_S, now)
+        if job_id is not None:
+            sql += " AND id = ?"
+            params += (job_id,)
+        return self._conn().execute(sql, params).rowcount
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        query = "SELECT id, status, request, result, error, created, updated, lease_expires FROM jobs WHERE id = ?"
+        row = self._conn().execute(query, (job_id,)).fetchone()
+        if row is None:
+            return None
+        lease_expires = row[7] if row[7] is not None else row[6] + JOB_LEASE_S
+        if row[1] in ("queued", "running") and lease_expires < time.time():
+            # Only write when the job is actually stale, so polling stays read-only
+            self.sweep_stale_jobs(job_id)
+            row = self._conn().execute(query, (job_id,)).fetchone()
+        return {
+            "jobId": row[0],
+            "status": row[1],
+            "request": json.loads(row[2]),
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "created": row[5],
+            "updated": row[6],
+        }
+
+    # File cache
+
+    def cache_get(self, key: str, kind: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT value FROM file_cache WHERE key = ? AND kind = ?", (key, kind)
+        ).fetchone()
+        return row[0] if row else None
+
+    def cache_put(self, key: str, kind: str, value: str) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO file_cache (key, kind, value, updated) VALUES (?, ?, ?, ?)",
+            (key, kind, value, time.time()),
+        )
+
+    # Locks
+
+    def acquire_lock(self, name: str, ttl: float = 600.0, owner: Optional[str] = None) -> bool:
+        """
+        Try to take a named lease. Expired leases (e.g. from a crashed worker)
+        are reclaimed. Return True if the caller now holds the lock.
+        owner defaults to the calling thread (see owner_id).
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM locks WHERE name = ? AND expires < ?", (name, now))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO locks (name, owner, expires) VALUES (?, ?, ?)",
+                (name, owner or owner_id(), now + ttl),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount == 1
+
+    def renew_lock(self, name: str, ttl: float, owner: Optional[str] = None) -> bool:
+        """Push back the expiry of a lease we still hold; False if it was lost."""
+        cur = self._conn().execute(
+            "UPDATE locks SET expires = ? WHERE name = ? AND owner = ?",
+            (time.time() + ttl, name, owner or owner_id()),
+        )
+        return cur.rowcount == 1
+
+    def release_lock(self, name: str, owner: Optional[str] = None) -> None:
+        self._conn().execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner or owner_id()))
+
+
+_stores: Dict[Path, Store] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(cache_dir: Path) -> Store:
+    """Return the process-wide Store for cache_dir."""
+    path = Path(cache_dir) / DB_NAME
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = Store(path)
+        return _stores[path]
@@ -3,6 +3,19 @@ from __future__ import annotations
 import re
 from typing import List, Tuple, Optional
 
+from .dedupe import collapse_near_duplicates
+
+
+# Per-file summary sections that merging draws from (see PROMPT_TEMPLATE)
+SECTION_OVERVIEW = "Overview"
+SECTION_KEY_CONCEPTS = "Key Concepts (explained like to a kid)"
+SECTION_FORMULAS = "Formulas (copy exactly) + one-line meaning"
+SECTION_ALGORITHMS = "Algorithms (short steps + when to use)"
+MERGED_SECTIONS = (SECTION_OVERVIEW, SECTION_KEY_CONCEPTS, SECTION_FORMULAS, SECTION_ALGORITHMS)
+# Prose sections where reworded repeats are collapsed. Formulas and algorithm
+# steps/code only drop exact duplicates: a one-character change matters there.
+NEAR_DUPLICATE_SECTIONS = (SECTION_OVERVIEW, SECTION_KEY_CONCEPTS)
+
 
 def _extract_section(text: str, heading: str) -> List[str]:
     pattern = re.compile(rf"^##\s+{re.escape(heading)}\s*$", re.IGNORECASE | re.MULTILINE)
@@ -27,6 +40,21 @@ def _unique_preserve_order(items: List[str]) -> List[str]:
     return out
 
 
+def resolve_dedupe_threshold(threshold: Optional[float] = None) -> float:
+    """Return threshold, or STUDY_AGENT_DEDUPE_THRESHOLD when it is None."""
+    if threshold is not None:
+        return threshold
+    from .config import get_defaults
+
+    return get_defaults()["dedupe_threshold"]
+
+
+def _dedupe_section(heading: str, lines: List[str], threshold: float) -> List[str]:
+    if heading in NEAR_DUPLICATE_SECTIONS:
+        return collapse_near_duplicates(lines, threshold)
+    return _unique_preserve_order(lines)
+
+
 def _extract_algorithm_names(lines: List[str]) -> List[str]:
     import re
     names: List[str] = []
@@ -56,22 +84,57 @@ def _extract_algorithm_names(lines: List[str]) -> List[str]:
     return names
 
 
-def merge_file_summaries(subject_name: str, file_summaries: List[Tuple[str, str]], semester: Optional[str] = None) -> str:
+def combine_summaries(
+    name: str, file_summaries: List[Tuple[str, str]], dedupe_threshold: Optional[float] = None
+) -> str:
+    """
+    Combine summaries into one summary in the per-file format (same ## sections,
+    duplicates and near-duplicates removed, nothing truncated). Unlike
+    merge_file_summaries the result can be combined again, which is what
+    folder-level rollups need.
+    """
+    threshold = resolve_dedupe_threshold(dedupe_threshold)
+    md = [f"# File: {name}"]
+    for heading in MERGED_SECTIONS:
+        lines: List[str] = []
+        for _, summary in file_summaries:
+            lines.extend(_extract_section(summary, heading))
+        lines = _dedupe_section(heading, lines, threshold)
+        if lines:
+            md.append(f"## {heading}")
+            md.extend(lines)
+    return "\n".join(md)
+
+
+def merge_file_summaries(
+    subject_name: str,
+    file_summaries: List[Tuple[str, str]],
+    semester: Optional[str] = None,
+    dedupe_threshold: Optional[float] = None,
+) -> str:
+    """
+    Merge per-file summaries into the subject's Simple Notes. Overview and key
+    concept bullets whose wording overlaps by at least dedupe_threshold
+    (content-word overlap; default STUDY_AGENT_DEDUPE_THRESHOLD) and whose
+    subject, numbers, formulas and contrast words match are collapsed, so the
+    point limits are spent on distinct concepts.
+    """
+    threshold = resolve_dedupe_threshold(dedupe_threshold)
     overviews: List[str] = []
     key_concepts: List[str] = []
     formulas: List[str] = []
     algorithms_raw: List[str] = []
 
     for _, summary in file_summaries:
-        overviews.extend(_extract_section(summary, "Overview"))
-        key_concepts.extend(_extract_section(summary, "Key Concepts (explained like to a kid)"))
-        formulas.extend(_extract_section(summary, "Formulas (copy exactly) + one-line meaning"))
-        algorithms_raw.extend(_extract_section(summary, "Algorithms (short steps + when to use)"))
-
-    overviews = _unique_preserve_order(overviews)
-    key_concepts = _unique_preserve_order(key_concepts)
-    formulas = _unique_preserve_order(formulas)
-    algorithms_raw = _unique_preserve_order(algorithms_raw)
+        overviews.extend(_extract_section(summary, SECTION_OVERVIEW))
+        key_concepts.extend(_extract_section(summary, SECTION_KEY_CONCEPTS))
+        formulas.extend(_extract_section(summary, SECTION_FORMULAS))
+        algorithms_raw.extend(_extract_section(summary, SECTION_ALGORITHMS))
+
+    overviews = _dedupe_section(SECTION_OVERVIEW, overviews, threshold)
+    key_concepts = _dedupe_section(SECTION_KEY_CONCEPTS, key_concepts, threshold)
+    formulas = _dedupe_section(SECTION_FORMULAS, formulas, threshold)
+    algorithms_raw = _dedupe_section(SECTION_ALGORITHMS, algorithms_raw, threshold)
     algorithm_names = _extract_algorithm_names(algorithms_raw)
 
     max_points = 14
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .dedupe import DEDUPE_VERSION
+from .store import Store
+from .summarizer import combine_summaries, merge_file_summaries, resolve_dedupe_threshold
+
+CACHE_KIND = "merge"
+
+
+class _Folder:
+    # Children are keyed by Drive folder id: sibling folders may share a name
+    def __init__(self, name: str):
+        self.name = name
+        self.files: List[Tuple[str, str]] = []
+        self.subfolders: Dict[str, "_Folder"] = {}
+
+    def child(self, folder_id: str, name: str) -> "_Folder":
+        if folder_id not in self.subfolders:
+            self.subfolders[folder_id] = _Folder(name)
+        return self.subfolders[folder_id]
+
+
+def _sha(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def folder_path(file: Dict) -> List[Tuple[str, str]]:
+    """
+    Return the (folder id, folder name) pairs between the listed root and a
+    file from list_study_files. Listings without ids fall back to the names.
+    """
+    names = file.get("folderPath") or []
+    ids = file.get("folderIds") or names
+    return list(zip(ids, names))
+
+
+def build_tree(root_name: str, items: Sequence[Tuple[Sequence[Tuple[str, str]], str, str]]) -> _Folder:
+    """
+    Build the folder tree from (folder path, file name, summary) items, where
+    the folder path lists (folder id, name) pairs below the root (see
+    folder_path). Folders are told apart by id, so two sibling "Week 1"
+    folders stay separate; the name is only used for display.
+    """
+    root = _Folder(root_name)
+    for path, name, summary in items:
+        node = root
+        for folder_id, folder_name in path:
+            node = node.child(folder_id, folder_name)
+        node.files.append((name, summary))
+    return root
+
+
+class TreeMerger:
+    """
+    Merges summaries bottom-up along the Drive folder hierarchy. Each folder's
+    combined result is cached in the store under a hash of its children's
+    results, so after one file changes only the folders on its path to the
+    root are recombined; every other subtree is a cache hit. The near-duplicate
+    threshold and rules version are part of the hash, since they change the
+    combined text.
+    """
+
+    def __init__(self, store: Optional[Store] = None, dedupe_threshold: Optional[float] = None):
+        self.store = store
+        self.dedupe_threshold = resolve_dedupe_threshold(dedupe_threshold)
+        self.recomputed = 0
+        self.reused = 0
+
+    def _merge(self, node: _Folder) -> Tuple[str, str]:
+        """Return (hash, combined summary) for node."""
+        children: List[Tuple[str, str, str]] = []
+        for name, summary in node.files:
+            children.append((_sha("file", name, summary), name, summary))
+        for folder_id in sorted(node.subfolders, key=lambda k: (node.subfolders[k].name, k)):
+            child = node.subfolders[folder_id]
+            child_hash, child_text = self._merge(child)
+            children.append((child_hash, child.name, child_text))
+
+        node_hash = _sha(
+            "folder", node.name, repr(self.dedupe_threshold), str(DEDUPE_VERSION), *(h for h, _, _ in children)
+        )
+        cached = self.store.cache_get(node_hash, CACHE_KIND) if self.store else None
+        if cached is not None:
+            self.reused += 1
+            return node_hash, cached
+        combined = combine_summaries(
+            node.name, [(name, text) for _, name, text in children], dedupe_threshold=self.dedupe_threshold
+        )
+        if self.store:
+            self.store.cache_put(node_hash, CACHE_KIND, combined)
+        self.recomputed += 1
+        return node_hash, combined
+
+    def merge(self, root: _Folder) -> str:
+        """Return the combined (per-file format) summary of the whole tree."""
+        return self._merge(root)[1]
+
+
+def merge_tree(
+    subject_name: str,
+    root_name: str,
+    items: Sequence[Tuple[Sequence[Tuple[str, str]], str, str]],
+    store: Optional[Store] = None,
+    semester: Optional[str] = None,
+    dedupe_threshold: Optional[float] = None,
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Hierarchical rollup: combine summaries folder by folder (cached), then
+    render the root as the usual Simple Notes. Return (markdown, stats).
+    """
+    merger = TreeMerger(store, dedupe_threshold=dedupe_threshold)
+    combined = merger.merge(build_tree(root_name, items))
+    md = merge_file_summaries(
+        subject_name, [(root_name, combined)], semester=semester, dedupe_threshold=merger.dedupe_threshold
+    )
+    return md, {"recomputed": merger.recomputed, "reused": merger.reused}
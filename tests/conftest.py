@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Tests never talk to Google: a dummy key satisfies get_gemini_config() and the
+# caches live in a throwaway directory instead of the project's .cache/.
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ["STUDY_AGENT_CACHE_DIR"] = tempfile.mkdtemp(prefix="study-agent-tests-")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
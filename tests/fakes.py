@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import requests
+
+from src.drive_client import MIME_FOLDER, MIME_GOOGLE_DOC, MIME_GOOGLE_SLIDES, MIME_PDF, MIME_PPTX
+
+# Stand-in Drive and Gemini backends with configurable latency, used by the
+# tests and by scripts/load_test.py to exercise the app without Google
+# accounts or quota.
+
+_PARENT_RE = re.compile(r"'([^']+)' in parents")
+_FILE_NAME_RE = re.compile(r"# File: (.+)")
+_MEDIA_PATH_RE = re.compile(r"/files/([^/?]+)\?alt=media")
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)")
+
+FAKE_TOKEN = "fake-token"
+# Large enough that PDFs take the ranged download path by default
+DEFAULT_PDF_BYTES = 9 * 1024 * 1024
+_EXTENSIONS = {MIME_PDF: ".pdf", MIME_PPTX: ".pptx"}
+
+_TOPICS = [
+    "A stack is LIFO: the last plate you put on is the first one you take off.",
+    "A queue is FIFO, like the line at the canteen.",
+    "Binary search halves the search space at every step.",
+    "A hash table maps keys to buckets using a hash function.",
+    "BFS visits a graph level by level using a queue.",
+    "DFS goes deep first using a stack or recursion.",
+    "Merge sort splits the list, sorts the halves and merges them.",
+    "A heap keeps the smallest (or largest) item at the top.",
+]
+
+
+class Latency:
+    """
+    Latency model: a lognormal around mean_s (jitter is the sigma, 0 = fixed),
+    plus an optional slow tail where tail_rate of calls take tail_s longer.
+    """
+
+    def __init__(self, mean_s: float = 0.0, jitter: float = 0.0, tail_rate: float = 0.0, tail_s: float = 0.0):
+        self.mean_s = mean_s
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_s = tail_s
+        self._rng = random.Random(0)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            base = self.mean_s * self._rng.lognormvariate(0, self.jitter) if self.jitter else self.mean_s
+            if self.tail_rate and self._rng.random() < self.tail_rate:
+                base += self.tail_s
+        return base
+
+    def sleep(self) -> None:
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def fake_document_text(name: str, chars: int) -> str:
+    """Lecture-notes-like text of about chars characters, with a repeated footer per page."""
+    lines: List[str] = []
+    size = 0
+    page = 1
+    rng = random.Random(name)
+    while size < chars:
+        for _ in range(8):
+            line = f"{rng.choice(_TOPICS)} ({name}, note {rng.randint(1, 999)})"
+            lines.append(line)
+            size += len(line) + 1
+        lines.append(f"Data Structures 101 | Page {page}")
+        lines.append("")
+        page += 1
+    return "\n".join(lines)
+
+
+def fake_pdf_bytes(name: str, size: int) -> bytes:
+    """Deterministic PDF-looking bytes of exactly size bytes (random body, so misplaced ranges show)."""
+    head = f"%PDF-1.4\n% {name}\n".encode("utf-8")
+    tail = b"\n%%EOF\n"
+    return head + random.Random(name).randbytes(max(0, size - len(head) - len(tail))) + tail
+
+
+def fake_pptx_bytes(name: str, slides: int = 3) -> bytes:
+    """A small real .pptx with a title, bullets and speaker notes per slide."""
+    from pptx import Presentation
+
+    rng = random.Random(name)
+    prs = Presentation()
+    for n in range(1, slides + 1):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"{name}: part {n}"
+        slide.placeholders[1].text = "\n".join(rng.sample(_TOPICS, 3))
+        slide.notes_slide.notes_text_frame.text = rng.choice(_TOPICS)
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+
+class _LocalServer:
+    """Threaded HTTP server on a free localhost port."""
+
+    _server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "server not started"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _serve(self, handler: type, name: str) -> None:
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name=name, daemon=True).start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _send(handler: BaseHTTPRequestHandler, status: int, headers: Mapping[str, str], data: bytes) -> None:
+    try:
+        handler.send_response(status)
+        for key, value in headers.items():
+            handler.send_header(key, value)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+    except OSError:
+        # Client aborted (hedging, cancellation or a failed ranged download)
+        pass
+
+
+class _FakeRequest:
+    def __init__(self, latency: Latency, result: Any):
+        self._latency = latency
+        self._result = result
+
+    def execute(self, num_retries: int = 0) -> Any:
+        self._latency.sleep()
+        return self._result
+
+
+class _FakeCredentials:
+    """Enough of google.auth Credentials for AuthorizedSession and _FakeHttp."""
+
+    token = FAKE_TOKEN
+
+    def refresh(self, request: Any) -> None:
+        pass
+
+    def before_request(self, request: Any, method: str, url: str, headers: Dict[str, str]) -> None:
+        headers["Authorization"] = f"Bearer {self.token}"
+
+
+class _HttpResponse(dict):
+    """httplib2.Response look-alike: lowercased headers plus status and reason."""
+
+    def __init__(self, resp: requests.Response):
+        super().__init__({k.lower(): v for k, v in resp.headers.items()})
+        self.status = resp.status_code
+        self.reason = resp.reason
+
+
+class _FakeHttp:
+    """Stands in for the authorized httplib2 client that googleapiclient requests go through."""
+
+    def __init__(self, credentials: _FakeCredentials):
+        self.credentials = credentials
+
+    def request(
+        self, uri: str, method: str = "GET", body: Any = None, headers: Optional[Dict[str, str]] = None, **_kwargs: Any
+    ) -> Tuple[_HttpResponse, bytes]:
+        headers = dict(headers or {})
+        self.credentials.before_request(None, method, uri, headers)
+        resp = requests.request(method, uri, data=body, headers=headers, timeout=120)
+        return _HttpResponse(resp), resp.content
+
+
+class _FakeMediaRequest:
+    """What MediaIoBaseDownload reads from the HttpRequest returned by get_media."""
+
+    def __init__(self, http: _FakeHttp, uri: str):
+        self.http = http
+        self.uri = uri
+        self.headers: Dict[str, str] = {}
+
+
+class _FakeFiles:
+    def __init__(self, drive: "FakeDrive", service: "FakeDriveService"):
+        self._drive = drive
+        self._service = service
+
+    def list(self, q: str = "", pageToken: Optional[str] = None, **_kwargs: Any) -> _FakeRequest:
+        m = _PARENT_RE.search(q)
+        items = self._drive.children(m.group(1) if m else "")
+        if f"mimeType='{MIME_FOLDER}'" in q:
+            items = [i for i in items if i["mimeType"] == MIME_FOLDER]
+        return _FakeRequest(self._drive.latency, {"files": items})
+
+    def export(self, fileId: str, mimeType: str, **_kwargs: Any) -> _FakeRequest:
+        if mimeType == MIME_PDF:
+            return _FakeRequest(self._drive.latency, fake_pdf_bytes(fileId, 64 * 1024))
+        text = fake_document_text(fileId, self._drive.doc_chars)
+        return _FakeRequest(self._drive.latency, text.encode("utf-8"))
+
+    def get(self, fileId: str, **_kwargs: Any) -> _FakeRequest:
+        return _FakeRequest(self._drive.latency, {"id": fileId, "name": f"Folder {fileId}"})
+
+    def get_media(self, fileId: str, **_kwargs: Any) -> _FakeMediaRequest:
+        return _FakeMediaRequest(self._service._http, f"{self._drive.url}/drive/v3/files/{fileId}?alt=media")
+
+
+class FakeDrive(_LocalServer):
+    """
+    In-memory Drive folder tree: `root` with `subfolders` subfolders, each
+    folder holding `files_per_folder` files whose types cycle through
+    mime_types (Docs, PDFs, Slides and .pptx by default). Every call sleeps
+    for the configured latency, like the blocking googleapiclient calls do.
+    With fresh_revisions every listing reports new revisions, so no request
+    is served from the per-file cache.
+
+    PDFs (pdf_bytes each) and .pptx files are served by a local HTTP server,
+    started with start(), that honours Range requests and checks the bearer
+    token. Listings report their size and md5Checksum, so downloads take the
+    same sequential or ranged path as against Drive. With ignore_range the
+    server answers every Range request with the whole file, like a proxy
+    that strips the header.
+    """
+
+    def __init__(
+        self,
+        files_per_folder: int = 5,
+        subfolders: int = 0,
+        latency: Optional[Latency] = None,
+        doc_chars: int = 4000,
+        fresh_revisions: bool = True,
+        mime_types: Sequence[str] = (MIME_GOOGLE_DOC, MIME_PDF, MIME_GOOGLE_SLIDES, MIME_PPTX),
+        pdf_bytes: int = DEFAULT_PDF_BYTES,
+        ignore_range: bool = False,
+    ):
+        self.files_per_folder = files_per_folder
+        self.subfolders = subfolders
+        self.latency = latency or Latency()
+        self.doc_chars = doc_chars
+        self.fresh_revisions = fresh_revisions
+        self.mime_types = tuple(mime_types)
+        self.pdf_bytes = pdf_bytes
+        self.ignore_range = ignore_range
+        self.credentials = _FakeCredentials()
+        # Media GETs served, and how many of them asked for a byte range
+        self.media_calls = 0
+        self.range_calls = 0
+        self._listing = count(1)
+        self._media: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def media(self, file_id: str, mime_type: str) -> bytes:
+        """Content of a binary file, generated on first use."""
+        with self._lock:
+            data = self._media.get(file_id)
+        if data is None:
+            data = fake_pdf_bytes(file_id, self.pdf_bytes) if mime_type == MIME_PDF else fake_pptx_bytes(file_id)
+            with self._lock:
+                data = self._media.setdefault(file_id, data)
+        return data
+
+    def children(self, folder_id: str) -> List[Dict[str, Any]]:
+        version = str(next(self._listing)) if self.fresh_revisions else "1"
+        items: List[Dict[str, Any]] = []
+        if folder_id == "root":
+            items.extend(
+                {"id": f"folder-{i}", "name": f"Unit {i}", "mimeType": MIME_FOLDER}
+                for i in range(1, self.subfolders + 1)
+            )
+        for i in range(1, self.files_per_folder + 1):
+            file_id = f"{folder_id}-file-{i}"
+            mime_type = self.mime_types[(i - 1) % len(self.mime_types)]
+            item = {
+                "id": file_id,
+                "name": f"{folder_id} lecture {i}{_EXTENSIONS.get(mime_type, '')}",
+                "mimeType": mime_type,
+                "version": version,
+            }
+            if mime_type in _EXTENSIONS:
+                data = self.media(file_id, mime_type)
+                # Drive reports size as a string
+                item.update(size=str(len(data)), md5Checksum=hashlib.md5(data).hexdigest())
+            items.append(item)
+        return items
+
+    def _respond(self, path: str, headers: Mapping[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        if headers.get("Authorization") != f"Bearer {FAKE_TOKEN}":
+            return 401, {}, b""
+        m = _MEDIA_PATH_RE.search(path)
+        with self._lock:
+            data = self._media.get(m.group(1)) if m else None
+        if data is None:
+            return 404, {}, b""
+        self.latency.sleep()
+        range_header = headers.get("Range")
+        with self._lock:
+            self.media_calls += 1
+            self.range_calls += bool(range_header)
+        m = _RANGE_RE.fullmatch((range_header or "").strip())
+        if self.ignore_range or m is None:
+            return 200, {"Content-Type": "application/octet-stream"}, data
+        start = int(m.group(1))
+        end = min(int(m.group(2)) if m.group(2) else len(data) - 1, len(data) - 1)
+        if start >= len(data):
+            return 416, {"Content-Range": f"bytes */{len(data)}"}, b""
+        return 206, {"Content-Range": f"bytes {start}-{end}/{len(data)}"}, data[start:end + 1]
+
+    def start(self) -> "FakeDrive":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                _send(self, *fake._respond(self.path, self.headers))
+
+            def log_message(self, *_args: Any) -> None:
+                pass
+
+        self._serve(Handler, "fake-drive")
+        return self
+
+    def service(self) -> "FakeDriveService":
+        return FakeDriveService(self)
+
+
+class FakeDriveService:
+    """
+    Minimal stand-in for the googleapiclient Drive v3 Resource, including the
+    _baseUrl and _http.credentials that drive_client uses for media downloads.
+    """
+
+    def __init__(self, drive: FakeDrive):
+        self._baseUrl = f"{drive.url}/drive/v3/" if drive._server is not None else None
+        self._http = _FakeHttp(drive.credentials)
+        self._files = _FakeFiles(drive, self)
+
+    def files(self) -> _FakeFiles:
+        return self._files
+
+
+def _fake_summary(name: str) -> str:
+    rng = random.Random(name)
+    concepts = rng.sample(_TOPICS, 4)
+    return "\n".join([
+        f"# File: {name}",
+        "## Overview",
+        f"- {concepts[0]}",
+        "## Key Concepts (explained like to a kid)",
+        *(f"- {c}" for c in concepts[1:]),
+        "## Formulas (copy exactly) + one-line meaning",
+        "- T(n) = 2T(n/2) + n: merge sort does n work per level.",
+        "## Algorithms (short steps + when to use)",
+        "- Binary Search: use on sorted lists.",
+    ])
+
+
+class FakeGeminiServer(_LocalServer):
+    """
+    Local HTTP server answering generateContent and countTokens like the Gemini
+    REST API, after the configured latency. error_rate of generate calls get a
+    503 so the client's retry path is exercised too.
+    """
+
+    def __init__(self, latency: Optional[Latency] = None, error_rate: float = 0.0):
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.calls = 0
+        self._rng = random.Random(1)
+        self._lock = threading.Lock()
+
+    def _respond(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        if path.split("?")[0].endswith(":countTokens"):
+            return 200, {"totalTokens": len(json.dumps(body)) // 4}
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.error_rate
+        self.latency.sleep()
+        if failed:
+            return 503, {"error": {"code": 503, "message": "fake overload"}}
+        text = "".join(p.get("text", "") for p in body["contents"][0]["parts"] if "text" in p)
+        m = _FILE_NAME_RE.search(text)
+        summary = _fake_summary(m.group(1).strip() if m else "file")
+        return 200, {"candidates": [{"content": {"parts": [{"text": summary}]}}]}
+
+    def start(self) -> "FakeGeminiServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                status, payload = fake._respond(self.path, body)
+                _send(self, status, {"Content-Type": "application/json"}, json.dumps(payload).encode("utf-8"))
+
+            def log_message(self, *_args: Any) -> None:
+                pass
+
+        self._serve(Handler, "fake-gemini")
+        return self
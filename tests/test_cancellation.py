@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from src import api, auth
+from src.deadline import CLIENT_DISCONNECTED, Cancelled, Deadline
+from src.drive_client import MIME_GOOGLE_DOC
+from src.gemini_client import GeminiClient
+
+from .fakes import FakeDrive, FakeGeminiServer, Latency
+
+FILES = 6
+CONCURRENCY = 2
+GEMINI_S = 5.0
+
+
+@pytest.fixture
+def slow_gemini(monkeypatch):
+    server = FakeGeminiServer(latency=Latency(GEMINI_S)).start()
+    monkeypatch.setenv("GEMINI_API_ROOTS", server.url)
+    monkeypatch.setenv("GEMINI_HEDGE", "0")
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def drive(monkeypatch):
+    # Fresh revisions so every file misses the summary cache and calls Gemini
+    drive = FakeDrive(files_per_folder=FILES, mime_types=[MIME_GOOGLE_DOC], fresh_revisions=True)
+    monkeypatch.setitem(api.defaults, "concurrency", CONCURRENCY)
+    auth.set_drive_service_factory(drive.service)
+    yield drive
+    auth.set_drive_service_factory(None)
+
+
+def _folder_request(**kwargs):
+    return api.SummarizeFolderRequest(folderId="root", subjectName="Cancel", **kwargs)
+
+
+class _DisconnectingRequest:
+    """Stands in for a Starlette Request whose client goes away after `after_s`."""
+
+    def __init__(self, after_s: float):
+        self._gone_at = time.monotonic() + after_s
+
+    async def is_disconnected(self) -> bool:
+        return time.monotonic() >= self._gone_at
+
+
+def test_cancel_aborts_an_in_flight_generate(slow_gemini):
+    client = GeminiClient(api_key="k", model_name="m", hedge=False)
+    client.api_roots = [slow_gemini.url]
+    deadline = Deadline()
+    threading.Timer(0.3, deadline.cancel, args=("stop",)).start()
+    started = time.monotonic()
+    with pytest.raises(Cancelled, match="stop"):
+        client.summarize_plain_text("Some notes", "notes.txt", deadline=deadline)
+    # The 5 s call was aborted, not waited out
+    assert time.monotonic() - started < 2.0
+    assert slow_gemini.calls == 1
+
+
+def test_client_disconnect_returns_499_and_drops_pending_files(drive, slow_gemini, monkeypatch):
+    monkeypatch.setattr(api, "DISCONNECT_POLL_S", 0.05)
+    deadline = Deadline()
+    started = time.monotonic()
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(
+            api._run_until_disconnected(_DisconnectingRequest(0.5), deadline, api._run_summarize, _folder_request())
+        )
+    assert err.value.status_code == 499
+    assert deadline.reason == CLIENT_DISCONNECTED
+    assert time.monotonic() - started < GEMINI_S
+    # Only the files already in flight reached Gemini; the rest never started
+    time.sleep(0.2)
+    assert slow_gemini.calls == CONCURRENCY
+
+
+def test_expired_deadline_returns_504(drive, slow_gemini):
+    from fastapi.testclient import TestClient
+
+    started = time.monotonic()
+    with TestClient(api.app) as client:
+        resp = client.post(
+            "/summarize-folder",
+            json={"folderId": "root", "subjectName": "Cancel", "timeoutSeconds": 0.5},
+        )
+    assert resp.status_code == 504
+    assert time.monotonic() - started < GEMINI_S
+    time.sleep(0.2)
+    assert slow_gemini.calls == CONCURRENCY
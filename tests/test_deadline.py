@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from src.deadline import DEADLINE_EXCEEDED, Cancelled, Deadline
+
+
+def test_cancel_runs_registered_callbacks_once():
+    deadline = Deadline()
+    calls = []
+    with deadline.on_cancel(lambda: calls.append("a")):
+        deadline.cancel("stop")
+        deadline.cancel("again")
+    assert calls == ["a"]
+    assert deadline.reason == "stop" and not deadline.expired
+    with pytest.raises(Cancelled, match="stop"):
+        deadline.check()
+
+
+def test_callback_is_unregistered_when_block_exits():
+    deadline = Deadline()
+    calls = []
+    with deadline.on_cancel(lambda: calls.append("a")):
+        pass
+    deadline.cancel()
+    assert calls == []
+
+
+def test_on_cancel_after_cancel_calls_immediately():
+    deadline = Deadline()
+    deadline.cancel()
+    calls = []
+    with deadline.on_cancel(lambda: calls.append("a")):
+        assert calls == ["a"]
+
+
+def test_block_exit_waits_for_a_running_callback():
+    deadline = Deadline()
+    started = threading.Event()
+    finished = []
+
+    def slow_callback():
+        started.set()
+        time.sleep(0.2)
+        finished.append(True)
+
+    with deadline.on_cancel(slow_callback):
+        t = threading.Thread(target=deadline.cancel)
+        t.start()
+        started.wait(1)
+    # The block only exits after the callback finished
+    assert finished == [True]
+    t.join()
+
+
+def test_timeout_expires_and_bounds_http_timeouts():
+    deadline = Deadline(timeout=0.3)
+    assert 0.1 <= deadline.timeout(120) <= 0.3
+    assert deadline.remaining() is not None
+    assert deadline.wait(2) is True
+    assert deadline.expired and deadline.reason == DEADLINE_EXCEEDED
+    with pytest.raises(Cancelled):
+        deadline.timeout(120)
+
+
+def test_no_limit_and_close():
+    deadline = Deadline()
+    assert deadline.remaining() is None and deadline.timeout(30) == 30
+    limited = Deadline(timeout=0.1)
+    limited.close()
+    time.sleep(0.2)
+    assert not limited.cancelled
+
+
+def test_default_request_timeout_is_unlimited(monkeypatch):
+    from src.config import get_defaults
+
+    monkeypatch.delenv("STUDY_AGENT_REQUEST_TIMEOUT", raising=False)
+    assert get_defaults()["request_timeout"] == 0
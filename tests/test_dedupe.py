@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+from src.dedupe import collapse_near_duplicates, content_words, jaccard, key_terms, lsh_params, overlap, subject
+from src.summarizer import merge_file_summaries
+
+DISTINCT_PAIRS = [
+    ("- Merge sort runs in O(n log n)", "- Quick sort worst case is O(n^2)"),
+    ("- Merge sort runs in O(n log n) time on every input.", "- Merge sort runs in O(n^2) time on every input."),
+    ("- A max-heap keeps the largest item at the top.", "- A min-heap keeps the smallest item at the top."),
+    (
+        "- Insert into a hash table by hashing the key to a bucket.",
+        "- Delete from a hash table by hashing the key to a bucket.",
+    ),
+    ("- Binary search needs about 20 steps for a million items.", "- Binary search needs about 30 steps for a million items."),
+    ("- Merge sort is a stable sorting algorithm.", "- Quick sort is not a stable sorting algorithm."),
+    ("- A queue is FIFO, like the line at the canteen.", "- A stack is LIFO, like a pile of plates."),
+    ("- A stack is LIFO: the last item in is the first item out.", "- A queue is FIFO: the first item in is the first item out."),
+    ("- Stacks are LIFO: last in, first out.", "- Stacks are LIFO: last in, first out; queues are FIFO: first in, first out."),
+    ("- An AVL tree keeps itself balanced after every insert.", "- A red-black tree keeps itself balanced after every insert."),
+    ("- Merge sort splits the list in half, sorts each half and merges them.", "- Quick sort splits the list around a pivot, sorts each part and joins them."),
+    ("- Use a stack to undo the last action first.", "- The call stack stores the last function called first."),
+]
+
+# Rewordings of one point, as different files' summaries put it
+STACK_REWORDINGS = [
+    "- A stack is LIFO: the last plate you put on is the first one you take off.",
+    "- Stacks are LIFO: last in, first out.",
+    "- A stack is LIFO: the last item in is the first item out.",
+    "- Stack = LIFO, so the last item pushed is the first one popped.",
+    "- A stack works LIFO: the last thing you put in comes out first.",
+]
+
+DUPLICATE_PAIRS = [
+    ("- Stacks are LIFO: last in, first out.", "- A stack is LIFO: the last item in is the first item out."),
+    ("- A heap keeps the smallest item at the top.", "- In a heap, the smallest item always sits at the top."),
+    ("- Dijkstra finds the shortest paths from one source.", "- Dijkstra's algorithm computes shortest paths from a single source node."),
+    ("- A hash table maps keys to buckets with a hash function.", "- Hash tables use a hash function to map each key to a bucket."),
+]
+
+
+@pytest.mark.parametrize("a, b", DISTINCT_PAIRS)
+def test_distinct_bullets_are_kept(a, b):
+    assert collapse_near_duplicates([a, b]) == [a, b]
+
+
+@pytest.mark.parametrize("a, b", DUPLICATE_PAIRS)
+def test_reworded_bullets_are_collapsed(a, b):
+    # One bullet is left: the one with more content words
+    assert collapse_near_duplicates([a, b]) == [max(a, b, key=lambda line: len(content_words(line)))]
+
+
+def test_rewordings_of_one_point_collapse_into_one_bullet():
+    # The fullest wording of the group is kept
+    assert collapse_near_duplicates(STACK_REWORDINGS) == [STACK_REWORDINGS[4]]
+
+
+def test_fuller_rewording_replaces_terse_one_in_place():
+    short = "- Binary search works on sorted arrays."
+    full = "- Binary search works on sorted arrays, halving the range each step until the item is found."
+    other = "- Hash tables map keys to buckets."
+    assert collapse_near_duplicates([short, other, full]) == [full, other]
+
+
+def test_subject():
+    assert subject("- A stack is LIFO") == subject("Stacks are LIFO") == "stack"
+    assert subject("- An AVL tree keeps itself balanced") == "avl"
+
+
+def test_key_terms():
+    assert key_terms("Merge sort runs in O(n log n)") == {"o(nlogn)"}
+    assert key_terms("A max-heap has 2 children per node") == {"max", "2"}
+    assert key_terms("Stacks hold plates") == frozenset()
+
+
+def test_content_words_ignore_filler_words_and_plurals():
+    assert content_words("A stack is LIFO") == content_words("Stacks are LIFO") == {"stack", "lifo"}
+    assert jaccard(frozenset(), frozenset()) == 1.0
+    assert overlap(frozenset({"a", "b"}), frozenset({"a", "b", "c"})) == 1.0
+
+
+def test_threshold_one_keeps_near_duplicates_but_drops_exact_ones():
+    a, b = DUPLICATE_PAIRS[0]
+    assert collapse_near_duplicates([a, b, a.upper()], threshold=1.0) == [a, b]
+
+
+def test_short_lines_are_only_deduplicated_exactly():
+    assert collapse_near_duplicates(["- Stacks", "- Stack", "- stacks"]) == ["- Stacks", "- Stack"]
+
+
+def test_lsh_params_split_all_permutations():
+    bands, rows = lsh_params(0.75)
+    assert bands * rows == 32
+
+
+def test_large_inputs_keep_first_of_each_group():
+    lines = []
+    for i in range(300):
+        word = "q" + "".join(chr(ord("a") + int(d)) for d in str(i))
+        lines.append(f"- {word} concept explains the topic with examples and pictures")
+        lines.append(f"- {word} concepts explain the topic with examples and pictures")
+    out = collapse_near_duplicates(lines)
+    assert out == lines[::2]
+
+
+def test_merge_keeps_heap_variants_and_collapses_paraphrase():
+    a = "# File: a\n## Key Concepts (explained like to a kid)\n- A max-heap keeps the largest item at the top.\n- A stack is LIFO: the last plate you put on is the first one you take off."
+    b = "# File: b\n## Key Concepts (explained like to a kid)\n- A min-heap keeps the smallest item at the top.\n- Stacks are LIFO: the last plate you put on is the first one you take off."
+    md = merge_file_summaries("DS", [("a", a), ("b", b)])
+    assert "max-heap" in md and "min-heap" in md
+    assert "A stack is LIFO" in md and "Stacks are LIFO" not in md
+
+
+def test_bullets_differing_only_in_a_number_stay_linear():
+    # Different key terms never share a bucket, so none of these is compared
+    # with the others; all-pairs checking took seconds here
+    lines = [f"- Step {i}: push the item onto the stack and check the top." for i in range(8000)]
+    started = time.perf_counter()
+    assert collapse_near_duplicates(lines) == lines
+    assert time.perf_counter() - started < 3.0
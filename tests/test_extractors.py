@@ -0,0 +1,145 @@
+import io
+
+import pytest
+
+import src.extractors as ex
+from src.drive_client import MIME_GOOGLE_DOC, MIME_PPT, MIME_PPTX, STUDY_MIME_TYPES, list_study_files
+
+MIME_MARKDOWN = "text/markdown"
+
+
+class _Listing:
+    def __init__(self, items):
+        self.items = items
+
+    def files(self):
+        return self
+
+    def list(self, **_kwargs):
+        return self
+
+    def execute(self):
+        return {"files": self.items}
+
+
+class _MarkdownExtractor(ex.Extractor):
+    def fetch(self, service, file, deadline):
+        return ex.Content(text=f"# {file['name']}")
+
+
+@pytest.fixture
+def markdown_registered():
+    ex.register_extractor(MIME_MARKDOWN, _MarkdownExtractor())
+    yield
+    ex.EXTRACTORS.pop(MIME_MARKDOWN, None)
+
+
+def _pptx_bytes(*titles):
+    from pptx import Presentation
+
+    prs = Presentation()
+    for title in titles:
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        slide.shapes.title.text = title
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+
+def test_extractor_requires_fetch():
+    class Incomplete(ex.Extractor):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_registered_types_are_listed_without_touching_drive_defaults(markdown_registered):
+    items = [
+        {"id": "1", "name": "notes.md", "mimeType": MIME_MARKDOWN},
+        {"id": "2", "name": "doc", "mimeType": MIME_GOOGLE_DOC},
+        {"id": "3", "name": "pic.png", "mimeType": "image/png"},
+    ]
+    assert [f["id"] for f in ex.list_supported_files(_Listing(items), "root")] == ["1", "2"]
+    assert MIME_MARKDOWN not in STUDY_MIME_TYPES
+    assert [f["id"] for f in list_study_files(_Listing(items), "root")] == ["2"]
+    content = ex.extract(None, {"id": "1", "name": "notes.md", "mimeType": MIME_MARKDOWN})
+    assert content.text == "# notes.md"
+
+
+def test_unsupported_types_raise():
+    with pytest.raises(ex.Unsupported):
+        ex.extract(None, {"id": "x", "mimeType": "image/png"})
+    with pytest.raises(ex.Unsupported, match="Legacy"):
+        ex.extract(None, {"id": "x", "mimeType": MIME_PPT})
+
+
+def test_pptx_is_parsed_in_the_process_pool(monkeypatch):
+    data = _pptx_bytes("Stacks", "Queues")
+    monkeypatch.setattr(ex, "download_pptx", lambda service, file_id, **_kwargs: data)
+    content = ex.extract(None, {"id": "p", "name": "deck.pptx", "mimeType": MIME_PPTX})
+    assert content.text.split() == ["Stacks", "Queues"]
+    assert ex._cpu_pool is not None
+
+
+@pytest.mark.parametrize(
+    "cores, workers, cpu_workers, expected",
+    [(8, 1, 0, 8), (8, 4, 0, 2), (2, 4, 0, 1), (8, 4, 3, 3)],
+)
+def test_cpu_pool_is_split_between_api_workers(monkeypatch, cores, workers, cpu_workers, expected):
+    monkeypatch.setattr(ex.os, "cpu_count", lambda: cores)
+    monkeypatch.setenv("STUDY_AGENT_WORKERS", str(workers))
+    monkeypatch.setenv("STUDY_AGENT_CPU_WORKERS", str(cpu_workers))
+    assert ex._cpu_workers() == expected
+
+
+def test_slides_text_is_paged_and_loses_its_footer():
+    from src.drive_client import MIME_GOOGLE_SLIDES
+    from src.preprocess import clean_extracted_text
+
+    from .fakes import FakeDrive
+
+    file = {"id": "deck", "name": "Deck", "mimeType": MIME_GOOGLE_SLIDES}
+    content = ex.extract(FakeDrive().service(), file)
+    assert content.paged
+    assert "Data Structures 101 | Page 2" in content.text
+    cleaned, stats = clean_extracted_text(content.text, paged=content.paged)
+    assert "Data Structures 101" not in cleaned
+    assert stats["tokens_saved"] > 0
+    assert not ex.extract(FakeDrive().service(), dict(file, mimeType=MIME_GOOGLE_DOC)).paged
+
+
+class _ShortcutListing(_Listing):
+    """A folder holding one shortcut to a PDF elsewhere in Drive."""
+
+    def __init__(self):
+        super().__init__([{
+            "id": "sc",
+            "name": "Lecture 1 (shortcut)",
+            "mimeType": "application/vnd.google-apps.shortcut",
+            "shortcutDetails": {"targetId": "pdf1", "targetMimeType": "application/pdf"},
+        }])
+        self.gets = []
+
+    def get(self, fileId, fields, **_kwargs):
+        self.gets.append((fileId, fields))
+        return _Result({"size": "2048", "md5Checksum": "abc", "version": "7", "modifiedTime": "2024-01-01T00:00:00Z"})
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def execute(self):
+        return self.value
+
+
+def test_shortcut_targets_carry_their_revision():
+    from src.cache import revision_key
+
+    listing = _ShortcutListing()
+    (file,) = list_study_files(listing, "root")
+    assert listing.gets == [("pdf1", "size, md5Checksum, version, modifiedTime")]
+    assert file["id"] == "pdf1" and file["size"] == 2048
+    # A revision key means the summary is cached and locked like any file
+    assert revision_key(file) == "pdf1@abc"
@@ -0,0 +1,87 @@
+import hashlib
+import logging
+
+import pytest
+import requests
+
+import src.drive_client as dc
+from src.drive_client import MIME_GOOGLE_DOC, MIME_PDF, MIME_PPTX
+from src.extractors import list_supported_files
+
+from .fakes import FakeDrive
+
+PDF_BYTES = 200 * 1024
+
+
+@pytest.fixture
+def small_ranges(monkeypatch):
+    # Take the ranged path for the small test PDFs, in several ranges
+    monkeypatch.setattr(dc, "RANGED_DOWNLOAD_MIN_BYTES", 64 * 1024)
+    monkeypatch.setattr(dc, "RANGED_CHUNK_BYTES", 64 * 1024)
+
+
+def _drive(**kwargs):
+    return FakeDrive(files_per_folder=4, pdf_bytes=PDF_BYTES, **kwargs).start()
+
+
+def _listed(drive, mime_type):
+    return next(f for f in list_supported_files(drive.service(), "root") if f["mimeType"] == mime_type)
+
+
+def test_corpus_lists_binary_files_with_size_and_md5():
+    drive = _drive()
+    try:
+        files = list_supported_files(drive.service(), "root")
+        assert {f["mimeType"] for f in files} == {MIME_GOOGLE_DOC, MIME_PDF, MIME_PPTX, dc.MIME_GOOGLE_SLIDES}
+        pdf = _listed(drive, MIME_PDF)
+        assert pdf["size"] == PDF_BYTES
+        assert pdf["md5Checksum"] == hashlib.md5(drive.media(pdf["id"], MIME_PDF)).hexdigest()
+    finally:
+        drive.stop()
+
+
+def test_large_pdf_takes_the_ranged_path(small_ranges):
+    drive = _drive()
+    try:
+        pdf = _listed(drive, MIME_PDF)
+        data = dc.download_pdf(drive.service(), pdf["id"], size=pdf["size"], md5=pdf["md5Checksum"])
+        assert data == drive.media(pdf["id"], MIME_PDF)
+        assert drive.range_calls == drive.media_calls == 4
+    finally:
+        drive.stop()
+
+
+def test_server_ignoring_range_falls_back_to_sequential(small_ranges, caplog):
+    drive = _drive(ignore_range=True)
+    try:
+        pdf = _listed(drive, MIME_PDF)
+        with caplog.at_level(logging.WARNING, logger="src.drive_client"):
+            data = dc.download_pdf(drive.service(), pdf["id"], size=pdf["size"], md5=pdf["md5Checksum"])
+        assert data == drive.media(pdf["id"], MIME_PDF)
+        assert "downloading sequentially" in caplog.text
+    finally:
+        drive.stop()
+
+
+def test_rejected_token_is_raised_not_retried(small_ranges):
+    drive = _drive()
+    try:
+        pdf = _listed(drive, MIME_PDF)
+        drive.credentials.token = "expired"
+        with pytest.raises(requests.HTTPError):
+            dc.download_pdf(drive.service(), pdf["id"], size=pdf["size"], md5=pdf["md5Checksum"])
+    finally:
+        drive.stop()
+
+
+def test_pptx_downloads_sequentially_and_parses():
+    drive = _drive()
+    try:
+        pptx = _listed(drive, MIME_PPTX)
+        data = dc.download_pptx(drive.service(), pptx["id"], size=pptx["size"], md5=pptx["md5Checksum"])
+        assert drive.range_calls == drive.media_calls == 1
+        text = dc.pptx_bytes_to_text(data)
+        assert f"{pptx['id']}: part 1" in text
+        assert text.count("\f") == 3
+    finally:
+        drive.stop()
@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.abortable import AbortableSession
+from src.gemini_client import GeminiClient, HedgeBudget, HedgeState, LatencyTracker, _Attempt
+
+
+class _Server:
+    """
+    Gemini stand-in: roots ending in /slow answer after `slow_s`, and the first
+    `fail_first` calls get a 503.
+    """
+
+    def __init__(self, slow_s=3.0, fail_first=0):
+        self.slow_s = slow_s
+        self.fail_first = fail_first
+        self.calls = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with server.lock:
+                    server.calls += 1
+                    failed = server.calls <= server.fail_first
+                if self.path.startswith("/slow"):
+                    time.sleep(server.slow_s)
+                status = 503 if failed else 200
+                body = {"error": "busy"} if failed else {"candidates": [{"content": {"parts": [{"text": self.path}]}}]}
+                data = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except OSError:
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        host, port = self.httpd.server_address[:2]
+        self.url = f"http://{host}:{port}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    srv = _Server()
+    yield srv
+    srv.close()
+
+
+def _client(roots, hedge=False, hedging=None):
+    if hedging is None:
+        hedging = HedgeState(max_rate=1.0)
+        hedging.latency = LatencyTracker(min_samples=1, default_s=0.2, floor_s=0.0)
+    client = GeminiClient(api_key="k", model_name="m", hedge=hedge, hedging=hedging)
+    client.api_roots = roots
+    return client
+
+
+def _idle(client):
+    sessions = []
+    while not client._idle_sessions.empty():
+        sessions.append(client._idle_sessions.get_nowait())
+    return sessions
+
+
+def test_hedge_wins_and_loser_session_is_discarded(server):
+    client = _client([f"{server.url}/slow", f"{server.url}/fast"], hedge=True)
+    t0 = time.monotonic()
+    text = client.summarize_plain_text("notes", "f")
+    assert text.startswith("/fast/")
+    assert time.monotonic() - t0 < server.slow_s
+    # Let the aborted primary unwind, then only the winner's session is pooled
+    client.hedging.executor().shutdown(wait=True)
+    idle = _idle(client)
+    assert len(idle) == 1 and not idle[0].aborted
+    # The aborted primary's elapsed time is a sample too, not only the winner's
+    samples = sorted(client.hedging.latency._samples)
+    assert len(samples) == 2 and samples[1] >= 0.2
+
+
+def test_shared_state_with_real_defaults_hedges_a_later_request(server):
+    # Earlier requests (fast calls) teach the shared tracker; a new client for
+    # the next request starts from that instead of the 30 s default
+    hedging = HedgeState()
+    warmup = _client([f"{server.url}/fast"], hedging=hedging)
+    for _ in range(hedging.latency.min_samples):
+        warmup.summarize_plain_text("notes", "f")
+    assert hedging.latency.threshold() == hedging.latency.floor_s
+    client = _client([f"{server.url}/slow", f"{server.url}/fast"], hedge=True, hedging=hedging)
+    t0 = time.monotonic()
+    assert client.summarize_plain_text("notes", "f").startswith("/fast/")
+    assert time.monotonic() - t0 < server.slow_s
+    assert hedging.budget.hedges == 1
+
+
+def test_budget_allows_a_first_hedge_then_caps_the_rate():
+    budget = HedgeBudget()
+    allowed = []
+    for _ in range(20):
+        budget.record_call()
+        allowed.append(budget.try_hedge())
+    assert allowed[0] is True
+    assert sum(allowed) == 2
+
+
+def test_cancel_after_finish_leaves_session_alone():
+    attempt = _Attempt(AbortableSession())
+    assert attempt.finish() is True
+    attempt.cancel()
+    assert not attempt.session.aborted
+    assert not attempt.cancelled.is_set()
+
+
+def test_cancel_before_finish_aborts_and_blocks_reuse():
+    attempt = _Attempt(AbortableSession())
+    attempt.cancel()
+    assert attempt.session.aborted
+    assert attempt.finish() is False
+
+
+def test_acquire_skips_aborted_sessions():
+    client = _client([])
+    dead, live = AbortableSession(), AbortableSession()
+    dead.abort()
+    client._idle_sessions.put(dead)
+    client._idle_sessions.put(live)
+    assert client._acquire_session() is live
+
+
+def test_latency_is_recorded_per_http_call_not_per_retry_loop():
+    srv = _Server(fail_first=1)
+    try:
+        client = _client([f"{srv.url}/fast"])
+        client.summarize_plain_text("notes", "f")
+    finally:
+        srv.close()
+    samples = list(client.hedging.latency._samples)
+    # The retry waited ~2 s of backoff; only the successful call is sampled
+    assert len(samples) == 1 and samples[0] < 1.0
+
+
+def test_api_requests_share_hedging_state():
+    from src import api
+
+    assert api._gemini_client().hedging is api._gemini_client().hedging
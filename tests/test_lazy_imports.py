@@ -0,0 +1,30 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ["googleapiclient", "google_auth_oauthlib", "google.auth", "pptx", "requests"]
+
+
+@pytest.mark.parametrize("module", ["src.main", "src.api"])
+def test_entry_points_do_not_import_heavy_clients(module):
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    assert proc.stdout.strip() == ""
+
+
+def test_drive_client_loads_pptx_on_first_use():
+    code = (
+        "import sys, src.drive_client as d; before = 'pptx' in sys.modules; "
+        "from src.drive_client import pptx_bytes_to_text\n"
+        "try:\n    pptx_bytes_to_text(b'not a pptx')\nexcept Exception:\n    pass\n"
+        "print(before, 'pptx' in sys.modules)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    assert proc.stdout.split() == ["False", "True"]
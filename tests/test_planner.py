@@ -0,0 +1,107 @@
+import logging
+
+from src.cache import FileCache
+from src.drive_client import MIME_GOOGLE_DOC, MIME_PDF, MIME_PPT
+from src.planner import LocalTokenCounter, format_plan, plan_files
+from src.store import Store
+
+
+class _FixedCounter:
+    def __init__(self, tokens=None, error=None):
+        self.tokens = tokens
+        self.error = error
+        self.calls = 0
+
+    def count_text_tokens(self, text, file_name):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.tokens
+
+
+def _cache(tmp_path):
+    return FileCache(Store(tmp_path / "plan.db"))
+
+
+def _files():
+    return [
+        {"id": "a", "name": "A", "mimeType": MIME_GOOGLE_DOC, "version": "1"},
+        {"id": "b", "name": "B", "mimeType": MIME_GOOGLE_DOC, "version": "1"},
+        {"id": "c", "name": "C", "mimeType": MIME_PDF, "size": "1000000", "version": "1"},
+        {"id": "d", "name": "D", "mimeType": MIME_PPT, "version": "1"},
+        {"id": "e", "name": "E", "mimeType": MIME_GOOGLE_DOC, "version": "1"},
+    ]
+
+
+def test_plan_counts_cached_text_with_counter(tmp_path):
+    cache = _cache(tmp_path)
+    files = _files()
+    cache.put_text(files[0], "Stacks are LIFO.")
+    cache.put_text(files[1], "Queues are FIFO.")
+    cache.put_summary(files[4], "m", "# done")
+    counter = _FixedCounter(tokens=123)
+
+    plan = plan_files(files, cache, "m", counter=counter)
+
+    by_name = {e["name"]: e for e in plan["perFile"]}
+    assert counter.calls == 2
+    assert by_name["A"]["inputTokens"] == 123 and by_name["A"]["source"] == "cached-text"
+    assert by_name["C"]["source"] == "metadata"
+    assert by_name["D"]["status"] == "skipped"
+    assert by_name["E"]["status"] == "cache-hit"
+    assert plan["requests"] == 3 and plan["cacheHits"] == 1 and plan["skipped"] == 1
+    assert plan["warnings"] == []
+
+
+def test_plan_falls_back_to_local_estimate_and_warns(tmp_path, caplog):
+    cache = _cache(tmp_path)
+    files = _files()[:2]
+    cache.put_text(files[0], "Stacks are LIFO.")
+    cache.put_text(files[1], "Queues are FIFO.")
+    counter = _FixedCounter(error=RuntimeError("Gemini countTokens error: 403"))
+
+    with caplog.at_level(logging.WARNING, logger="src.planner"):
+        plan = plan_files(files, cache, "m", counter=counter)
+
+    local = LocalTokenCounter()
+    assert counter.calls == 1  # no further countTokens calls after the first failure
+    assert [e["inputTokens"] for e in plan["perFile"]] == [
+        local.count_text_tokens("Stacks are LIFO.", "A"),
+        local.count_text_tokens("Queues are FIFO.", "B"),
+    ]
+    assert len(plan["warnings"]) == 1 and "403" in plan["warnings"][0]
+    assert "local estimate" in caplog.text
+    assert "Warning: Token counting failed" in format_plan(plan)
+
+
+def test_plan_endpoint_does_not_block_the_event_loop():
+    import threading
+    import time
+
+    from fastapi.testclient import TestClient
+
+    from src import api, auth
+
+    from .fakes import FakeDrive, Latency
+
+    drive = FakeDrive(files_per_folder=3, mime_types=[MIME_GOOGLE_DOC], latency=Latency(1.0))
+    auth.set_drive_service_factory(drive.service)
+    try:
+        with TestClient(api.app) as client:
+            result = {}
+            planning = threading.Thread(
+                target=lambda: result.update(resp=client.post("/plan", json={"folderId": "root"}))
+            )
+            planning.start()
+            time.sleep(0.3)
+            # /plan is waiting on the slow Drive listing; other requests still get through
+            started = time.monotonic()
+            assert client.get("/health").status_code == 200
+            assert time.monotonic() - started < 0.5
+            planning.join()
+    finally:
+        auth.set_drive_service_factory(None)
+    resp = result["resp"]
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["files"] == body["requests"] == 3
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from src import auth
+from src.deadline import Cancelled
+from src.drive_client import MIME_FOLDER, MIME_GOOGLE_DOC
+from src.prefetch import FolderPrefetcher
+
+TREE = {
+    "root": [{"id": "a", "name": "Unit A", "mimeType": MIME_FOLDER}, {"id": "b", "name": "Unit B", "mimeType": MIME_FOLDER}],
+    "a": [{"id": "a1", "name": "Stacks", "mimeType": MIME_GOOGLE_DOC}],
+    "b": [{"id": "b1", "name": "Queues", "mimeType": MIME_GOOGLE_DOC}],
+}
+
+
+class _Service:
+    """files().list() over TREE; listings of folders in `slow` block until released."""
+
+    def __init__(self, drive):
+        self.drive = drive
+
+    def files(self):
+        return self
+
+    def list(self, q, **_kwargs):
+        self._parent = q.split("'")[1]
+        self._folders_only = "mimeType=" in q
+        return self
+
+    def execute(self):
+        parent = self._parent
+        with self.drive.lock:
+            self.drive.calls.append((threading.current_thread().name, parent))
+        if parent in self.drive.slow:
+            self.drive.release.wait(5)
+        items = TREE.get(parent, [])
+        if self._folders_only:
+            items = [i for i in items if i["mimeType"] == MIME_FOLDER]
+        return {"files": items}
+
+
+class _Drive:
+    def __init__(self, slow=()):
+        self.slow = set(slow)
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.calls = []
+        self.services = 0
+
+    def service(self):
+        with self.lock:
+            self.services += 1
+        return _Service(self)
+
+
+@pytest.fixture
+def drive():
+    drives = []
+
+    def make(slow=()):
+        d = _Drive(slow)
+        auth.set_drive_service_factory(d.service)
+        drives.append(d)
+        return d
+
+    yield make
+    for d in drives:
+        d.release.set()
+    auth.set_drive_service_factory(None)
+
+
+def _wait_for(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.01)
+
+
+def test_prefetched_listing_is_reused(drive):
+    d = drive()
+    with FolderPrefetcher() as prefetcher:
+        prefetcher.prefetch_files("root")
+        _wait_for(lambda: len(d.calls) == 3)
+        files = prefetcher.files(_Service(d), "root")
+    assert [f["id"] for f in files] == ["a1", "b1"]
+    assert len(d.calls) == 3  # nothing listed twice
+
+
+def test_pool_threads_reuse_their_own_service(drive):
+    d = drive()
+    with FolderPrefetcher(max_workers=2) as prefetcher:
+        prefetcher.prefetch_subfolders(["root", "a", "b", "x", "y", "z"])
+        for fid in ["root", "a", "b", "x", "y", "z"]:
+            prefetcher.subfolders(_Service(d), fid)
+    assert d.services <= 2
+    assert {name for name, _ in d.calls if name != "MainThread"} <= {
+        "study-agent-prefetch_0",
+        "study-agent-prefetch_1",
+    }
+
+
+def test_queued_listing_is_fetched_directly_instead_of_waiting(drive):
+    d = drive(slow={"a"})
+    with FolderPrefetcher(max_workers=1) as prefetcher:
+        prefetcher.prefetch_subfolders(["a"])  # occupies the only worker
+        prefetcher.prefetch_files("b")  # queued behind it
+        t0 = time.monotonic()
+        files = prefetcher.files(_Service(d), "b")
+        assert time.monotonic() - t0 < 1
+        assert [f["id"] for f in files] == ["b1"]
+
+
+def test_navigating_away_cancels_a_running_walk(drive):
+    d = drive(slow={"a"})
+    with FolderPrefetcher() as prefetcher:
+        prefetcher.prefetch_files("root")
+        _wait_for(lambda: ("study-agent-prefetch_0", "a") in d.calls)
+        fut, deadline = prefetcher._files["root"]
+        prefetcher.prefetch_files("b")
+        assert deadline.cancelled
+        d.release.set()
+        with pytest.raises(Cancelled):
+            fut.result(timeout=2)
+    # The walk stopped at the next page instead of listing folder b
+    assert ("study-agent-prefetch_0", "b") not in d.calls
+
+
+def test_close_stops_running_walks(drive):
+    d = drive(slow={"a"})
+    prefetcher = FolderPrefetcher()
+    prefetcher.prefetch_files("root")
+    _wait_for(lambda: any(parent == "a" for _, parent in d.calls))
+    fut, deadline = prefetcher._files["root"]
+    prefetcher.close()
+    d.release.set()
+    with pytest.raises(Cancelled):
+        fut.result(timeout=2)
+    # Lookups still work after close, without the pool
+    assert [f["id"] for f in prefetcher.files(_Service(d), "b")] == ["b1"]
@@ -0,0 +1,82 @@
+from src.preprocess import clean_extracted_text
+
+
+def _slides(*pages):
+    return "\f".join("\n".join(p) for p in pages)
+
+
+def test_paged_text_drops_footers_and_page_numbers():
+    text = _slides(
+        ["Stacks are LIFO", "CS201 Data Structures", "1"],
+        ["Queues are FIFO", "CS201 Data Structures", "2"],
+        ["Heaps keep the min on top", "CS201 Data Structures", "Slide 3 of 4"],
+        ["Tries store prefixes", "CS201 Data Structures", "4"],
+    )
+    cleaned, stats = clean_extracted_text(text, paged=True)
+    assert "CS201" not in cleaned
+    assert "Slide 3" not in cleaned and "\n1\n" not in f"\n{cleaned}\n"
+    assert "Stacks are LIFO" in cleaned and "Tries store prefixes" in cleaned
+    assert stats["lines_removed"] == 8
+    assert stats["tokens_saved"] > 0
+
+
+def test_unpaged_docs_text_keeps_numbers_and_code():
+    text = "\n".join([
+        "The answer to the exercise is",
+        "42",
+        "",
+        "int main() {",
+        "  return 0;",
+        "}",
+        "",
+        "int helper() {",
+        "  return 0;",
+        "}",
+        "",
+        "void noop() {",
+        "}",
+    ])
+    cleaned, stats = clean_extracted_text(text)
+    lines = cleaned.splitlines()
+    assert "42" in lines
+    assert lines.count("}") == 3
+    assert lines.count("return 0;") == 2
+    assert stats["lines_removed"] == 0
+
+
+def test_paged_text_keeps_repeated_code_and_formulas():
+    code = ["for (i = 0; i < n; i++) {", "sum += a[i];", "}", "T(n) = 2T(n/2) + n"]
+    text = _slides(["Loop 1", *code], ["Loop 2", *code], ["Loop 3", *code], ["Loop 4", *code])
+    cleaned, _ = clean_extracted_text(text, paged=True)
+    lines = cleaned.splitlines()
+    assert lines.count("}") == 4
+    assert lines.count("T(n) = 2T(n/2) + n") == 4
+
+
+def test_duplicate_prose_lines_are_dropped():
+    text = "Binary search halves the range\n\nBinary search halves the range\nOnly on sorted lists"
+    cleaned, stats = clean_extracted_text(text)
+    assert cleaned.count("Binary search halves the range") == 1
+    assert stats["lines_removed"] == 1
+
+
+def test_pipe_separated_footers_are_dropped():
+    text = _slides(*(
+        [f"Topic {n}: {topic}", "CS201 | Data Structures | Fall 2024", f"Data Structures 101 | Page {n}"]
+        for n, topic in enumerate(["stacks", "queues", "heaps", "tries", "graphs", "hashing", "sorting"], 1)
+    ))
+    cleaned, stats = clean_extracted_text(text, paged=True)
+    assert "CS201" not in cleaned and "Page" not in cleaned
+    assert "Topic 7: sorting" in cleaned
+    assert stats["lines_removed"] == 14
+
+
+def test_slides_text_export_is_paged_by_blank_lines():
+    # Google Slides text exports separate slides with blank lines, not form feeds
+    slides = [["Stacks are LIFO", "CS201 | Fall 2024", str(n)] for n in range(1, 5)]
+    text = "\n\n".join("\n".join(s) for s in slides)
+    cleaned, _ = clean_extracted_text(text, paged=True)
+    assert "CS201" not in cleaned and "\n3\n" not in f"\n{cleaned}\n"
+    # The same text from a Doc keeps its numbers
+    unpaged, _ = clean_extracted_text(text)
+    assert "\n3\n" in f"\n{unpaged}\n"
@@ -0,0 +1,70 @@
+import cProfile
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.profiling import RunProfiler
+
+
+def _busy(n):
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+def _worker_task(n):
+    # Long enough for the stack sampler to see the worker threads
+    end = threading.Event()
+    end.wait(0.05)
+    return _busy(n)
+
+
+def test_profiles_worker_threads_and_leaves_no_hooks(tmp_path):
+    profiler = RunProfiler(sample_interval=0.002).start()
+    try:
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="profiled-worker") as pool:
+            results = list(pool.map(_worker_task, [20000] * 6))
+        _busy(1000)
+    finally:
+        profiler.stop()
+    assert results == [_busy(20000)] * 6  # no worker died under the profiler
+
+    paths = profiler.write(tmp_path)
+    assert set(paths) == {"pstats", "text", "collapsed", "memory"}
+    collapsed = paths["collapsed"].read_text()
+    assert "profiled-worker" in collapsed
+    assert "_busy" in paths["text"].read_text()
+    assert "Peak traced memory" in paths["memory"].read_text()
+
+    # Nothing keeps profiling after stop(), in this thread or new ones
+    assert sys.getprofile() is None
+    seen = []
+    t = threading.Thread(target=lambda: seen.append(sys.getprofile()))
+    t.start()
+    t.join()
+    assert seen == [None]
+
+
+def test_only_one_run_is_profiled_at_a_time():
+    first = RunProfiler().start()
+    try:
+        with pytest.raises(RuntimeError):
+            RunProfiler().start()
+    finally:
+        first.stop()
+    RunProfiler().start().stop()
+
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="cProfile is per-thread before 3.12")
+def test_refuses_to_start_under_another_profiler():
+    outer = cProfile.Profile()
+    outer.enable()
+    try:
+        with pytest.raises(RuntimeError, match="Cannot profile"):
+            RunProfiler().start()
+    finally:
+        outer.disable()
+    RunProfiler().start().stop()
@@ -0,0 +1,148 @@
+import hashlib
+import logging
+
+import pytest
+import requests
+
+import src.drive_client as dc
+from src.deadline import Cancelled, Deadline
+
+DATA = bytes(range(256)) * 40  # 10 KiB
+
+
+class _Response:
+    def __init__(self, status, body=b"", truncate=0):
+        self.status_code = status
+        self.body = body[: len(body) - truncate] if truncate else body
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), 100):
+            yield self.body[i:i + 100]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+    def close(self):
+        pass
+
+
+class _Session:
+    """Serves DATA with Range support; `status`/`error` override every response."""
+
+    def __init__(self, status=206, error=None, truncate=0, on_get=None, fail_once=()):
+        self.fail_once = set(fail_once)
+        self.status = status
+        self.error = error
+        self.truncate = truncate
+        self.on_get = on_get
+        self.ranges = []
+
+    def get(self, url, headers, timeout, stream):
+        if self.on_get:
+            self.on_get()
+        if self.error is not None:
+            raise self.error
+        start, end = map(int, headers["Range"].split("=")[1].split("-"))
+        self.ranges.append((start, end))
+        if start in self.fail_once:
+            self.fail_once.discard(start)
+            return _Response(503)
+        body = DATA[start:end + 1] if self.status == 206 else DATA
+        return _Response(self.status, body, truncate=self.truncate)
+
+
+@pytest.fixture
+def ranged(monkeypatch):
+    monkeypatch.setattr(dc, "RANGED_DOWNLOAD_MIN_BYTES", 1024)
+    monkeypatch.setattr(dc, "RANGED_CHUNK_BYTES", 4096)
+    monkeypatch.setattr(dc, "RANGED_RETRY_BACKOFF_S", 0)
+    sequential = []
+
+    def _sequential(service, file_id, deadline):
+        sequential.append(file_id)
+        return DATA
+
+    monkeypatch.setattr(dc, "_download_sequential", _sequential)
+
+    def use(session):
+        monkeypatch.setattr(dc, "_authorized_session", lambda service: session)
+        return sequential
+
+    return use
+
+
+def _download(md5=None, deadline=None):
+    return dc.download_media(object(), "f1", size=len(DATA), md5=md5, deadline=deadline)
+
+
+def test_ranged_download_reassembles_and_checks_md5(ranged):
+    session = _Session()
+    sequential = ranged(session)
+    assert _download(md5=hashlib.md5(DATA).hexdigest()) == DATA
+    assert sorted(session.ranges) == [(0, 4095), (4096, 8191), (8192, 10239)]
+    assert sequential == []
+
+
+@pytest.mark.parametrize(
+    "session",
+    [
+        _Session(status=200),
+        _Session(status=503),
+        _Session(truncate=10),
+        _Session(error=requests.ConnectionError("reset")),
+    ],
+    ids=["range-ignored", "server-error", "short-read", "connection-error"],
+)
+def test_range_failures_fall_back_to_sequential_and_log(ranged, session, caplog):
+    sequential = ranged(session)
+    with caplog.at_level(logging.WARNING, logger="src.drive_client"):
+        assert _download() == DATA
+    assert sequential == ["f1"]
+    assert "downloading sequentially" in caplog.text
+
+
+def test_failed_range_is_retried_without_refetching_the_others(ranged):
+    session = _Session(fail_once={4096})
+    sequential = ranged(session)
+    data = _download(md5=hashlib.md5(DATA).hexdigest())
+    assert data == DATA and sequential == []
+    assert sorted(session.ranges) == [(0, 4095), (4096, 8191), (4096, 8191), (8192, 10239)]
+    # The assembly buffer is returned as is, not copied into bytes
+    assert isinstance(data, bytearray)
+
+
+def test_persistent_range_errors_give_up_after_the_attempts(ranged):
+    session = _Session(status=503)
+    ranged(session)
+    _download()
+    assert session.ranges.count((0, 4095)) == dc.RANGED_RANGE_ATTEMPTS
+
+
+def test_auth_errors_are_raised_not_retried(ranged):
+    sequential = ranged(_Session(status=403))
+    with pytest.raises(requests.HTTPError):
+        _download()
+    assert sequential == []
+
+
+def test_checksum_mismatch_is_raised(ranged):
+    sequential = ranged(_Session())
+    with pytest.raises(dc.ChecksumMismatch):
+        _download(md5="0" * 32)
+    assert sequential == []
+
+
+def test_cancel_during_ranged_download_does_not_fall_back(ranged):
+    deadline = Deadline()
+    sequential = ranged(_Session(on_get=lambda: deadline.cancel("client disconnected")))
+    with pytest.raises(Cancelled):
+        _download(deadline=deadline)
+    assert sequential == []
+
+
+def test_small_files_use_the_sequential_path(ranged):
+    session = _Session()
+    sequential = ranged(session)
+    assert dc.download_media(object(), "small", size=100) == DATA
+    assert sequential == ["small"] and session.ranges == []
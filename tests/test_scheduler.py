@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from src.deadline import Cancelled, Deadline
+from src.drive_client import MIME_GOOGLE_DOC, MIME_PDF, MIME_PPTX
+from src.scheduler import estimate_tokens, run_scheduled, schedule_order
+
+
+def _files():
+    return [
+        {"id": "doc", "mimeType": MIME_GOOGLE_DOC},
+        {"id": "small-pdf", "mimeType": MIME_PDF, "size": "100000"},
+        {"id": "big-pdf", "mimeType": MIME_PDF, "size": "50000000"},
+        {"id": "pptx", "mimeType": MIME_PPTX, "size": "2000000"},
+        {"id": "doc-2", "mimeType": MIME_GOOGLE_DOC},
+    ]
+
+
+def test_estimate_tokens_uses_size_then_type_default():
+    assert estimate_tokens({"mimeType": MIME_PDF, "size": "1000000"}) == 4300
+    assert estimate_tokens({"mimeType": MIME_PDF}) == 20000
+    assert estimate_tokens({"mimeType": "text/plain"}) == 0
+
+
+def test_schedule_order_is_largest_first_with_stable_ties():
+    files = _files()
+    order = [files[i]["id"] for i in schedule_order(files)]
+    assert order == ["big-pdf", "doc", "doc-2", "pptx", "small-pdf"]
+
+
+def test_run_scheduled_submits_largest_first_and_returns_listing_order():
+    files = _files()
+    started = []
+
+    def work(i, f):
+        started.append(f["id"])
+        return f["id"].upper()
+
+    results = run_scheduled(files, work, max_workers=1)
+    assert started[0] == "big-pdf"
+    assert results == [f["id"].upper() for f in files]
+
+
+def test_run_scheduled_cancel_drops_pending_files():
+    files = [{"id": str(i), "mimeType": MIME_GOOGLE_DOC} for i in range(6)]
+    deadline = Deadline()
+    started = []
+    release = threading.Event()
+
+    def work(i, f):
+        started.append(i)
+        if i == 0:
+            deadline.cancel("stop")
+        release.wait(1)
+        return i
+
+    with pytest.raises(Cancelled):
+        run_scheduled(files, work, max_workers=1, deadline=deadline)
+    assert started == [0]
+
+
+def test_run_scheduled_deadline_expiry_raises_cancelled():
+    files = [{"id": str(i), "mimeType": MIME_GOOGLE_DOC} for i in range(3)]
+    deadline = Deadline(timeout=0.2)
+
+    def work(i, f):
+        deadline.wait(5)
+        deadline.check()
+
+    t0 = time.monotonic()
+    with pytest.raises(Cancelled) as exc:
+        run_scheduled(files, work, max_workers=3, deadline=deadline)
+    assert exc.value.reason == "deadline exceeded"
+    assert time.monotonic() - t0 < 2
+
+
+class _Creds:
+    valid = True
+    expired = False
+    refresh_token = "r"
+
+
+def test_worker_threads_share_one_login(monkeypatch):
+    import googleapiclient.discovery
+
+    from src import auth
+
+    logins = []
+    monkeypatch.setattr(auth, "_credentials", None)
+    monkeypatch.setattr(auth, "_refresh_or_login", lambda token_path: logins.append(token_path) or _Creds())
+    monkeypatch.setattr(googleapiclient.discovery, "build", lambda *args, credentials, **kwargs: credentials)
+    files = [{"id": str(i), "size": 1} for i in range(8)]
+
+    def work(_, f):
+        time.sleep(0.05)
+        return auth.get_thread_drive_service()
+
+    for _ in range(2):
+        services = run_scheduled(files, work, max_workers=4)
+    # Every thread of both runs built its service from the same credentials
+    assert len(logins) == 1
+    assert len({id(s) for s in services}) == 1
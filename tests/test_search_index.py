@@ -0,0 +1,58 @@
+import os
+
+from src.search_index import MERGED_SOURCE, SearchIndex, split_sections
+
+
+def _write(path, text, mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_split_sections():
+    md = "intro\n# Title\n## Overview\n- stacks\n## Empty\n"
+    assert split_sections(md) == [("", "intro"), ("Overview", "- stacks")]
+
+
+def test_index_and_search_per_file_sections(tmp_path):
+    index = SearchIndex(tmp_path / "search.db")
+    index.index_summary(
+        "algo.md",
+        "Algorithms",
+        "# Algorithms\n## Overview\n- Graph search",
+        [("week1.pdf", "## Algorithms\n- Dijkstra's shortest path uses a heap")],
+    )
+    results = index.search("dijkstra's shortest")
+    assert results[0]["path"] == "algo.md" and results[0]["source"] == "week1.pdf"
+    assert index.search("graph")[0]["source"] == MERGED_SOURCE
+    assert index.search("!!!") == []
+
+
+def test_sync_indexes_new_and_changed_files(tmp_path):
+    out = tmp_path / "output"
+    _write(out / "a.md", "# A\n## Overview\n- heaps", mtime=1000)
+    index = SearchIndex(tmp_path / "search.db")
+    assert index.sync(out) == 1
+    assert index.sync(out) == 0
+    _write(out / "a.md", "# A\n## Overview\n- tries", mtime=2000)
+    assert index.sync(out) == 1
+    assert index.search("heaps") == []
+    assert index.search("tries")[0]["path"] == "a.md"
+
+
+def test_sync_prunes_deleted_summaries(tmp_path):
+    out = tmp_path / "output"
+    _write(out / "keep.md", "# Keep\n## Overview\n- queues are FIFO")
+    _write(out / "sub" / "gone.md", "# Gone\n## Overview\n- queues in BFS")
+    index = SearchIndex(tmp_path / "search.db")
+    assert index.sync(out) == 2
+    # Indexed as it was written (not by sync), then deleted by hand
+    index.index_summary("api.md", "Api", "# Api\n## Overview\n- queues written by the API")
+    assert {r["path"] for r in index.search("queues")} == {"keep.md", "sub/gone.md", "api.md"}
+
+    (out / "sub" / "gone.md").unlink()
+    assert index.sync(out) == 2
+    assert {r["path"] for r in index.search("queues")} == {"keep.md"}
+    documents = [row[0] for row in index._conn().execute("SELECT path FROM documents")]
+    assert documents == ["keep.md"]
@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+import time
+
+from src.cache import FileCache
+from src.store import STALE_JOB_ERROR, Heartbeat, Store
+
+
+def test_lock_is_exclusive_until_released(tmp_path):
+    store = Store(tmp_path / "s.db")
+    assert store.acquire_lock("a", ttl=60, owner="w1")
+    assert not store.acquire_lock("a", ttl=60, owner="w2")
+    store.release_lock("a", owner="w1")
+    assert store.acquire_lock("a", ttl=60, owner="w2")
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    store = Store(tmp_path / "s.db")
+    assert store.acquire_lock("a", ttl=0.05, owner="crashed")
+    time.sleep(0.1)
+    assert store.acquire_lock("a", ttl=60, owner="w2")
+    # The old owner can neither renew nor release the reclaimed lease
+    assert not store.renew_lock("a", ttl=60, owner="crashed")
+    store.release_lock("a", owner="crashed")
+    assert not store.acquire_lock("a", ttl=60, owner="w3")
+
+
+def test_heartbeat_keeps_a_lease_alive(tmp_path):
+    store = Store(tmp_path / "s.db")
+    assert store.acquire_lock("a", ttl=0.2, owner="w1")
+    with Heartbeat(lambda: store.renew_lock("a", 0.2, owner="w1"), 0.05):
+        time.sleep(0.5)
+        assert not store.acquire_lock("a", ttl=60, owner="w2")
+    time.sleep(0.3)
+    assert store.acquire_lock("a", ttl=60, owner="w2")
+
+
+def test_claim_summary_renews_its_lock_while_held(tmp_path, monkeypatch):
+    import src.cache as cache_mod
+
+    monkeypatch.setattr(cache_mod, "SUMMARY_LOCK_TTL_S", 0.3)
+    store = Store(tmp_path / "s.db")
+    cache = FileCache(store)
+    f = {"id": "f", "version": "1"}
+    other = []
+    with cache.claim_summary(f, "m") as cached:
+        assert cached is None
+        time.sleep(0.8)
+        # Another worker (thread) still finds the lock held
+        t = threading.Thread(target=lambda: other.append(store.acquire_lock("summary:f@1:m", ttl=60)))
+        t.start()
+        t.join()
+        cache.put_summary(f, "m", "# done")
+    assert other == [False]
+    with cache.claim_summary(f, "m") as cached:
+        assert cached == "# done"
+
+
+def test_stale_jobs_are_swept_as_failed(tmp_path):
+    store = Store(tmp_path / "s.db")
+    dead = store.create_job({"n": 1}, lease=0.05)
+    alive = store.create_job({"n": 2}, lease=60)
+    time.sleep(0.1)
+    job = store.get_job(dead)
+    assert job["status"] == "failed" and job["error"] == STALE_JOB_ERROR
+    assert store.get_job(alive)["status"] == "queued"
+    assert not store.renew_job(dead)
+    assert store.renew_job(alive)
+
+
+def test_finished_jobs_are_never_swept(tmp_path):
+    store = Store(tmp_path / "s.db")
+    job_id = store.create_job({}, lease=0.05)
+    store.update_job(job_id, "done", result={"ok": True})
+    time.sleep(0.1)
+    assert store.sweep_stale_jobs() == 0
+    assert store.get_job(job_id)["status"] == "done"
+
+
+def test_old_database_gains_the_lease_column(tmp_path):
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, result TEXT, "
+        "error TEXT, owner TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO jobs VALUES ('old', 'running', '{}', NULL, NULL, NULL, 0, 0)")
+    conn.commit()
+    conn.close()
+    store = Store(path)
+    # No lease recorded: the job goes stale JOB_LEASE_S after its last update
+    assert store.get_job("old")["status"] == "failed"
+    fresh = store.create_job({})
+    store._conn().execute("UPDATE jobs SET lease_expires = NULL, updated = ? WHERE id = ?", (time.time(), fresh))
+    assert store.get_job(fresh)["status"] == "queued"
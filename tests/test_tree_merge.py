@@ -0,0 +1,72 @@
+from src.drive_client import MIME_FOLDER, MIME_GOOGLE_DOC, list_study_files
+from src.store import Store
+from src.tree_merge import TreeMerger, build_tree, folder_path, merge_tree
+
+
+def _summary(name, point):
+    return f"# File: {name}\n## Overview\n- {point}"
+
+
+class _Listing:
+    """Drive files().list() stand-in over a {folder id: [items]} tree."""
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    def files(self):
+        return self
+
+    def list(self, q, **_kwargs):
+        parent = q.split("'")[1]
+        self._result = {"files": self.tree.get(parent, [])}
+        return self
+
+    def execute(self):
+        return self._result
+
+
+def test_listing_records_folder_ids():
+    service = _Listing({
+        "root": [
+            {"id": "w1a", "name": "Week 1", "mimeType": MIME_FOLDER},
+            {"id": "w1b", "name": "Week 1", "mimeType": MIME_FOLDER},
+        ],
+        "w1a": [{"id": "d1", "name": "Stacks", "mimeType": MIME_GOOGLE_DOC}],
+        "w1b": [{"id": "d2", "name": "Queues", "mimeType": MIME_GOOGLE_DOC}],
+    })
+    files = list_study_files(service, "root")
+    assert [folder_path(f) for f in files] == [[("w1a", "Week 1")], [("w1b", "Week 1")]]
+
+
+def test_folder_path_falls_back_to_names():
+    assert folder_path({"folderPath": ["Unit 1", "Week 2"]}) == [("Unit 1", "Unit 1"), ("Week 2", "Week 2")]
+    assert folder_path({}) == []
+
+
+def test_same_named_sibling_folders_stay_separate():
+    items = [
+        ([("w1a", "Week 1")], "stacks.pdf", _summary("stacks.pdf", "Stacks are LIFO")),
+        ([("w1b", "Week 1")], "queues.pdf", _summary("queues.pdf", "Queues are FIFO")),
+    ]
+    root = build_tree("DS", items)
+    assert sorted(root.subfolders) == ["w1a", "w1b"]
+    assert [f.name for f in root.subfolders.values()] == ["Week 1", "Week 1"]
+    assert [f.files[0][0] for f in root.subfolders.values()] == ["stacks.pdf", "queues.pdf"]
+
+    md, stats = merge_tree("DS", "DS", items)
+    assert "Stacks are LIFO" in md and "Queues are FIFO" in md
+    assert stats == {"recomputed": 3, "reused": 0}
+
+
+def test_unchanged_subtrees_are_reused(tmp_path):
+    store = Store(tmp_path / "s.db")
+    items = [
+        ([("u1", "Unit 1")], "a.pdf", _summary("a.pdf", "Heaps keep the smallest item on top")),
+        ([("u2", "Unit 2")], "b.pdf", _summary("b.pdf", "Tries store words by prefix")),
+    ]
+    merge_tree("DS", "DS", items, store=store)
+    items[1] = ([("u2", "Unit 2")], "b.pdf", _summary("b.pdf", "Tries share common prefixes"))
+    merger = TreeMerger(store)
+    combined = merger.merge(build_tree("DS", items))
+    assert "Tries share common prefixes" in combined
+    assert (merger.recomputed, merger.reused) == (2, 1)